@@ -1,8 +1,15 @@
 
 
 import tkinter as tk
-from tkinter import font as tkfont
-import heapq, math, time, random
+from tkinter import font as tkfont, filedialog
+import heapq, math, time, random, os, sys, struct, mmap, zlib, threading, queue, json, tracemalloc
+import cProfile, pstats
+from array import array
+from itertools import compress, repeat
+from functools import partial
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
 #  Grid
 ROWS        = 22
@@ -12,6 +19,14 @@ PANEL_W     = 240
 ANIM_DELAY  = 6        
 AGENT_DELAY = 130       
 OBS_PROB    = 0.0025     
+SEED        = None       # int for reproducible mazes and obstacle spawns
+CANVAS_CELLS = 40_000    # bigger grids are drawn into an image instead
+POLL_MS     = 15         # how often the UI collects background search output
+VISIT_BATCH = 512        # expansions per batch of a streaming search
+WEIGHT      = 2.0        # default epsilon of weighted A*
+ARA_BUDGET_MS = 50       # default time budget of anytime ARA*
+CROWD_SIZE  = 60         # agents planned by the app's crowd mode
+CROWD_SLACK = 32         # time steps a crowd agent may lose to waiting
 
 #  Colours
 # Grid
@@ -49,6 +64,7 @@ BTN = {
     "clear": ("#E74C3C", "#CB4335"),   
     "start": ("#1ABC9C", "#148F77"),   
     "goal":  ("#E67E22", "#CA6F1E"),   
+    "file":  ("#5D6D7E", "#4D5656"),
 }
 
 #  Heuristics
@@ -58,23 +74,159 @@ def manhattan(a, b):
 def euclidean(a, b):
     return math.hypot(a[0]-b[0], a[1]-b[1])
 #  Grid functions
-def make_grid(density=0.0):
-    g = [[0]*COLS for _ in range(ROWS)]
+class FlatGrid:
+    """Walls as one byte per cell in a flat bytearray.
+
+    Cells are padded with a ring of walls, so node id ``(r+1)*stride + c+1``
+    has its four neighbours at ``id + offsets[k]`` with no bounds checks.
+    """
+    _hpa = None         # HPAGraph, built on first hierarchical query
+    components = None   # opt-in ComponentIndex for instant "no path" answers
+    def __init__(self, rows=ROWS, cols=COLS, cells=None):
+        self.rows, self.cols = rows, cols
+        self.stride  = cols + 2
+        if cells is not None:       # padded layout, e.g. from another grid
+            self.cells = bytearray(cells)
+        else:
+            self.cells = bytearray(b"\x01") * ((rows + 2) * self.stride)
+            for r in range(1, rows + 1):
+                i = r * self.stride + 1
+                self.cells[i:i+cols] = bytes(cols)
+        # same order as the old neighbors(): up, down, left, right
+        self.offsets = (-self.stride, self.stride, -1, 1)
+        self.version = 0           # bumped on every wall edit
+        self._log    = []          # recent (version, ids, wall) edits
+        self._engine = None
+
+    @classmethod
+    def from_rows(cls, rows):
+        g = cls(len(rows), len(rows[0]) if rows else 0)
+        for r, row in enumerate(rows):
+            i = g.id(r, 0)
+            g.cells[i:i+g.cols] = bytes(1 if v else 0 for v in row)
+        return g
+
+    def id(self, r, c):
+        return (r+1)*self.stride + c+1
+
+    def pos(self, i):
+        r, c = divmod(i, self.stride)
+        return r-1, c-1
+
+    def __getitem__(self, rc):
+        return self.cells[(rc[0]+1)*self.stride + rc[1]+1]
+
+    def __setitem__(self, rc, v):
+        i, v = (rc[0]+1)*self.stride + rc[1]+1, 1 if v else 0
+        if self.cells[i] != v:
+            self.cells[i] = v
+            self._record((i,), v)
+
+    LOG_SIZE = 64
+
+    def _record(self, ids, wall):
+        self.version += 1
+        self._log.append((self.version, ids, wall))
+        if len(self._log) > self.LOG_SIZE: del self._log[0]
+
+    def changes_since(self, version, upto=None):
+        # (id, wall) edits made after version (up to upto, default now), or
+        # None once the log has lost some of them (too old, or made by
+        # another process on a SharedGrid).  Readers on the worker pass the
+        # version they read first, so edits landing meanwhile wait their turn.
+        if upto is None: upto = self.version
+        if version == upto: return []
+        recent = [e for e in self._log if version < e[0] <= upto]
+        if not recent or recent[0][0] != version + 1 or len(recent) != upto - version:
+            return None
+        return [(i, wall) for _, ids, wall in recent for i in ids]
+
+    def row(self, r):
+        # wall flags of row r, one per column
+        return self.cells[self.id(r, 0):self.id(r, 0)+self.cols]
+
+    def to_rows(self):
+        return [list(self.row(r)) for r in range(self.rows)]
+
+    def random_fill(self, density, rng=None, exclude=()):
+        # wall each free cell not in exclude with P(density); returns the new walls
+        return [self.pos(i) for i in self.random_fill_ids(density, rng, exclude)]
+
+    def random_fill_ids(self, density, rng=None, exclude=()):
+        # Dense fills threshold one random byte per cell (1/256
+        # resolution) with C-level translate and big-int masks; sparse ones
+        # jump between hits with geometric gaps, so per-step obstacle spawns
+        # cost O(new walls) rather than O(cells).
+        if density <= 0: return []
+        rng, cells, n = make_rng(rng), self.cells, len(self.cells)
+        skip = {self.id(*rc) for rc in exclude if rc}
+        idx = []
+        if density >= 1/32:
+            t = min(256, round(density * 256))
+            hit = rng.randbytes(n).translate(bytes(t*[1] + (256-t)*[0]))
+            old = int.from_bytes(cells, "little")
+            new = bytearray((int.from_bytes(hit, "little") & ~old).to_bytes(n, "little"))
+            for i in skip: new[i] = 0
+            idx = list(compress(range(n), new))
+            cells[:] = (old | int.from_bytes(new, "little")).to_bytes(n, "little")
+        else:
+            step, i = math.log1p(-density), -1
+            while True:
+                i += int(math.log(1.0 - rng.random()) / step) + 1
+                if i >= n: break
+                if not cells[i] and i not in skip:
+                    cells[i] = 1; idx.append(i)
+        if idx: self._record(idx, 1)
+        return idx
+
+    def jump_h(self, n, d, goal):
+        # step sideways from n until the goal, a forced neighbour or a wall (-1)
+        cells, s = self.cells, self.stride
+        while True:
+            n += d
+            if cells[n]: return -1
+            if n == goal: return n
+            if (not cells[n-s] and cells[n-d-s]) or (not cells[n+s] and cells[n-d+s]):
+                return n
+
+def as_grid(grid):
+    return grid if isinstance(grid, FlatGrid) else FlatGrid.from_rows(grid)
+
+def make_rng(rng=None):
+    # None -> the shared random module, int -> a seeded Random, else as given
+    if rng is None: return random
+    return random.Random(rng) if isinstance(rng, int) else rng
+
+def make_grid(density=0.0, rows=ROWS, cols=COLS, rng=None):
+    g = FlatGrid(rows, cols)
     if density > 0:
-        for r in range(ROWS):
-            for c in range(COLS):
-                if random.random() < density:
-                    g[r][c] = 1
+        g.random_fill_ids(density, rng)
     return g
 
 def neighbors(pos, grid):
     r, c = pos
-    out = []
-    for dr, dc in ((-1,0),(1,0),(0,-1),(0,1)):
-        nr, nc = r+dr, c+dc
-        if 0 <= nr < ROWS and 0 <= nc < COLS and grid[nr][nc] == 0:
-            out.append((nr, nc))
-    return out
+    if not isinstance(grid, FlatGrid):
+        # nested lists: bounds-check in place rather than convert per call
+        rows, cols = len(grid), len(grid[0]) if grid else 0
+        return [(nr, nc) for nr, nc in ((r-1, c), (r+1, c), (r, c-1), (r, c+1))
+                if 0 <= nr < rows and 0 <= nc < cols and grid[nr][nc] == 0]
+    i, cells = grid.id(r, c), grid.cells
+    probe = grid._engine and grid._engine.probe
+    if probe: cells = probe.cells(cells)
+    return [grid.pos(i+d) for d in grid.offsets if not cells[i+d]]
+
+def id_heuristic(grid, h, goal):
+    # Heuristic objects with a bind() method (tables, distance fields) give
+    # their own per-id function.  Plain h(a, b) functions get padded
+    # coordinates, which is fine because they only use differences.
+    if hasattr(h, "bind"):
+        return h.bind(grid, goal)
+    s = grid.stride
+    gr, gc = divmod(goal, s)
+    if h is manhattan:
+        return lambda i: abs(i//s - gr) + abs(i%s - gc)
+    gp = (gr, gc)
+    return lambda i: h(divmod(i, s), gp)
 
 def rebuild_path(cf, goal):
     path, node = [], goal
@@ -83,44 +235,2260 @@ def rebuild_path(cf, goal):
     path.reverse()
     return path
 
-#  Search algo
-def run_astar(grid, start, goal, h):
-    counter = 0
-    g = {start: 0}
-    heap = [(h(start, goal), 0, start)]
-    cf = {start: None}
-    closed = set()
-    visited_order = []
+def _as_cells(grid, result):
+    path, vis, ne = result
+    pos = grid.pos
+    return ([pos(i) for i in path] if path else None), [pos(i) for i in vis], ne
+
+#  Connected components
+class ComponentIndex:
+    """Labels of the 4-connected regions of free cells, kept in step with a grid.
+
+    Labels are joined in a union-find, so a removed wall that bridges two
+    regions is a single union.  A new wall may split its region, so BFS
+    runs from each of its free neighbours in lockstep and fronts that meet
+    are merged.  A front that runs dry first has enclosed a separate region
+    and gets a fresh label, so the work is bounded by the smaller pieces.
+    The index keeps its own copy of the walls, which lets it replay a batch
+    from changes_since() one edit at a time.
+    """
+    def __init__(self, grid):
+        self.grid, self.version = grid, grid.version
+        self.walls = walls = bytearray(bytes(grid.cells))
+        self.label = label = array('i', [-1]) * len(walls)
+        self.parent = []
+        offs, seen = grid.offsets, bytearray(walls)
+        i = seen.find(0)
+        while i != -1:
+            lab = self._new()
+            seen[i] = 1; label[i] = lab
+            frontier = [i]
+            while frontier:
+                nxt = []
+                for u in frontier:
+                    for d in offs:
+                        v = u + d
+                        if not seen[v]:
+                            seen[v] = 1; label[v] = lab; nxt.append(v)
+                frontier = nxt
+            i = seen.find(0, i + 1)
+
+    def _new(self):
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def sync(self):
+        grid, v = self.grid, self.grid.version
+        if v == self.version: return
+        changes = grid.changes_since(self.version, v)
+        if changes is None:
+            self.__init__(grid)
+            return
+        for i, wall in changes:
+            if self.walls[i] == wall: continue
+            self.walls[i] = wall
+            if wall: self._split(i)
+            else:    self._merge(i)
+        self.version = v
+
+    def _merge(self, i):
+        roots = {self.find(self.label[i+d]) for d in self.grid.offsets
+                 if not self.walls[i+d]}
+        lab = roots.pop() if roots else self._new()
+        for r in roots: self.parent[r] = lab
+        self.label[i] = lab
+
+    def _split(self, i):
+        walls, label = self.walls, self.label
+        label[i] = -1
+        offs = self.grid.offsets
+        starts = [i + d for d in offs if not walls[i + d]]
+        if len(starts) < 2: return
+        group = list(range(len(starts)))     # fronts known to be connected
+        def root(j):
+            while group[j] != j: j = group[j]
+            return j
+        owner = {v: j for j, v in enumerate(starts)}
+        queues = [deque([v]) for v in starts]
+        done = set()
+        while True:
+            roots = {root(j) for j in range(len(starts))} - done
+            if len(roots) == 1: return
+            live = {root(j) for j, q in enumerate(queues) if q}
+            for r in roots - live:
+                # this group's fronts are exhausted: it is a region of its own
+                lab = self._new()
+                for v, j in owner.items():
+                    if root(j) == r: label[v] = lab
+                done.add(r)
+            if len(live) <= 1: return
+            for j, q in enumerate(queues):
+                if not q: continue
+                u = q.popleft()
+                for d in offs:
+                    v = u + d
+                    if walls[v]: continue
+                    o = owner.get(v)
+                    if o is None:
+                        owner[v] = j; q.append(v)
+                    elif root(o) != root(j):
+                        group[root(o)] = root(j)
+
+    def connected(self, a, b):
+        self.sync()
+        la, lb = self.label[a], self.label[b]
+        return la < 0 or lb < 0 or self.find(la) == self.find(lb)
+
+def unreachable(grid, a, b):
+    # O(1) "no path" answer for grids that opted into a ComponentIndex
+    comp = grid.components
+    return comp is not None and not comp.connected(a, b)
+
+#  Heuristic tables
+FAR = 2**31 - 1     # distance-field value for cells the source cannot reach
+FIELD_FAR = {'i': FAR, 'H': 0xFFFF}     # the same, per array typecode
+
+def heuristic_table(grid, h, goal):
+    # h from every node id to goal, built a row at a time with C-level map()
+    s = grid.stride
+    gr, gc = divmod(goal, s)
+    table = array('d')
+    if h is manhattan:
+        dc = [abs(c - gc) for c in range(s)]
+        for r in range(grid.rows + 2):
+            table.extend(map(abs(r - gr).__add__, dc))
+    elif h is euclidean:
+        dc = [c - gc for c in range(s)]
+        for r in range(grid.rows + 2):
+            table.extend(map(math.hypot, repeat(r - gr, s), dc))
+    else:
+        for r in range(grid.rows + 2):
+            table.extend(h((r, c), (gr, gc)) for c in range(s))
+    return table
+
+class HeuristicCache:
+    """A heuristic whose per-goal tables are computed once and reused.
+
+    Pass it wherever a heuristic is expected.  The engines ask it for the
+    goal's table and then only index an array per push.  The tables hold
+    geometric values, so they depend on the map's size but not its walls.
+    """
+    def __init__(self, h, size=8):
+        self.h, self.size = h, size
+        self.tables = OrderedDict()
+
+    def __call__(self, a, b):
+        return self.h(a, b)
+
+    def table(self, grid, goal):
+        key = (grid.rows, grid.cols, goal)
+        t = self.tables.get(key)
+        if t is None:
+            t = self.tables[key] = heuristic_table(grid, self.h, goal)
+            if len(self.tables) > self.size: self.tables.popitem(last=False)
+        else:
+            self.tables.move_to_end(key)
+        return t
+
+    def bind(self, grid, goal):
+        return self.table(grid, goal).__getitem__
+
+def distance_field(grid, source, typecode='i'):
+    # BFS steps from source to every node id (FIELD_FAR[typecode] where unreachable)
+    cells, offs, far = grid.cells, grid.offsets, FIELD_FAR[typecode]
+    dist = array(typecode, [far]) * len(cells)
+    dist[source], frontier, d = 0, [source], 0
+    while frontier:
+        d += 1
+        nxt = []
+        for u in frontier:
+            for o in offs:
+                v = u + o
+                if not cells[v] and dist[v] == far:
+                    dist[v] = d; nxt.append(v)
+        frontier = nxt
+    return dist
+
+def repair_field(grid, dist, changes, source, far=FAR):
+    # Bring a BFS field from source up to date after (id, wall) edits.
+    # New walls: find the cells whose every shortest path ran through one
+    # (in distance order, a cell is lost if no unaffected neighbour sits one
+    # step closer), then re-settle just those.  Removed walls: relax outwards
+    # from the freed cells.
+    cells, offs = grid.cells, grid.offsets
+    ids = {i for i, _ in changes}
+    heap, lost = [], set()
+    for x in ids:
+        if cells[x] and dist[x] != far:
+            d, dist[x] = dist[x], far
+            for o in offs:
+                v = x + o
+                if not cells[v] and dist[v] == d + 1: heap.append((d + 1, v))
+    heapq.heapify(heap)
+    while heap:
+        d, v = heapq.heappop(heap)
+        if v in lost or v == source: continue
+        if any(not cells[v+o] and v+o not in lost and dist[v+o] == d - 1 for o in offs):
+            continue
+        lost.add(v)
+        for o in offs:
+            u = v + o
+            if not cells[u] and dist[u] == d + 1: heapq.heappush(heap, (d + 1, u))
+    for v in lost: dist[v] = far
+    for v in lost:
+        d = min([dist[v+o] for o in offs if not cells[v+o]], default=far)
+        if d < far: heap.append((d + 1, v))
+    heapq.heapify(heap)
     while heap:
-        _, _, cur = heapq.heappop(heap)
-        if cur in closed: continue
-        closed.add(cur)
-        visited_order.append(cur)
-        if cur == goal:
-            return rebuild_path(cf, goal), visited_order, len(visited_order)
-        for nb in neighbors(cur, grid):
+        d, v = heapq.heappop(heap)
+        if d >= dist[v]: continue
+        dist[v] = d
+        for o in offs:
+            u = v + o
+            if u in lost and d + 1 < dist[u]: heapq.heappush(heap, (d + 1, u))
+    queue = deque()
+    for x in ids:
+        if cells[x]: continue
+        d = 0 if x == source else min([dist[x+o] for o in offs if not cells[x+o]], default=far) + 1
+        if d < dist[x]:
+            dist[x] = d; queue.append(x)
+    while queue:
+        u = queue.popleft()
+        d = dist[u] + 1
+        for o in offs:
+            v = u + o
+            if not cells[v] and d < dist[v]:
+                dist[v] = d; queue.append(v)
+    return dist
+
+class TrueDistance:
+    """Perfect heuristic: the exact BFS distance to the goal.
+
+    Each goal's field is computed once and reused; wall edits since then
+    are patched in with repair_field, so the values stay exact.
+    """
+    dynamic = True          # values follow the walls
+
+    def __init__(self, size=8):
+        self.size = size
+        self.fields = OrderedDict()     # (id(grid), goal) -> (grid, version, field)
+
+    def field(self, grid, goal):
+        key = (id(grid), goal)
+        ent = self.fields.get(key)
+        v = grid.version
+        if ent is not None and ent[0] is grid:
+            changes = grid.changes_since(ent[1], v)
+            if changes is not None:
+                if changes: repair_field(grid, ent[2], changes, goal)
+                self.fields[key] = (grid, v, ent[2])
+                self.fields.move_to_end(key)
+                return ent[2]
+        f = distance_field(grid, goal)
+        self.fields[key] = (grid, v, f)
+        self.fields.move_to_end(key)
+        if len(self.fields) > self.size: self.fields.popitem(last=False)
+        return f
+
+    def bind(self, grid, goal):
+        return self.field(grid, goal).__getitem__
+
+#  Landmark (ALT) heuristic
+LM_MAGIC  = b"A2LT"
+LM_HEADER = struct.Struct("<4sHHcxxxII")
+
+class Landmarks:
+    """BFS distance tables from k landmark cells of one grid.
+
+    Landmarks are chosen farthest-first, so they sit on the edges of the
+    map.  Tables use 2-byte entries when the map is small enough.  sync()
+    repairs them after wall edits, and save()/load() keep them next to a
+    map file.
+    """
+    def __init__(self, grid, k=8, rng=None, ids=(), tables=()):
+        self.grid, self.k = grid, k
+        self.typecode = 'H' if len(grid.cells) < 0xFFFF else 'i'
+        self.far = FIELD_FAR[self.typecode]
+        self.ids, self.tables = list(ids), list(tables)
+        self.version = grid.version
+        if not self.ids: self._build(make_rng(rng))
+
+    def _build(self, rng):
+        grid, cells = self.grid, self.grid.cells
+        v = grid.version
+        free = [i for i in range(len(cells)) if not cells[i]]
+        self.ids, self.tables = [], []
+        if not free: return
+        # farthest-first: start from the cell farthest from a random one
+        seed = distance_field(grid, rng.choice(free), self.typecode)
+        near = seed
+        for _ in range(min(self.k, len(free))):
+            # unreachable cells count as farthest, so every region gets one
+            lm = max(free, key=near.__getitem__)
+            if lm in self.ids: break
+            t = distance_field(grid, lm, self.typecode)
+            self.ids.append(lm); self.tables.append(t)
+            near = t if near is seed else array(near.typecode, map(min, near, t))
+        self.version = v
+
+    def sync(self):
+        grid, v = self.grid, self.grid.version
+        if v == self.version: return
+        changes = grid.changes_since(self.version, v)
+        if changes is None or any(grid.cells[i] for i in self.ids):
+            self._build(random)
+            return
+        for lm, t in zip(self.ids, self.tables):
+            repair_field(grid, t, changes, lm, self.far)
+        self.version = v
+
+    def bind(self, goal):
+        # |d(L, goal) - d(L, n)| <= d(n, goal) for every landmark L; the
+        # max with Manhattan keeps it at least as strong in open areas
+        far, s = self.far, self.grid.stride
+        gr, gc = divmod(goal, s)
+        pairs = [(t, t[goal]) for t in self.tables if t[goal] != far]
+        def h(i):
+            best = abs(i//s - gr) + abs(i%s - gc)
+            for t, dg in pairs:
+                d = t[i]
+                if d == far: return math.inf    # other component than goal
+                d = d - dg if d > dg else dg - d
+                if d > best: best = d
+            return best
+        return h
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(LM_HEADER.pack(LM_MAGIC, 1, len(self.ids), self.typecode.encode(),
+                                   len(self.grid.cells), zlib.crc32(bytes(self.grid.cells))))
+            f.write(array('I', self.ids).tobytes())
+            for t in self.tables: f.write(t.tobytes())
+
+    @classmethod
+    def load(cls, path, grid):
+        # None when the file is missing or belongs to a different map
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            magic, fmt, k, tc, n, crc = LM_HEADER.unpack_from(data)
+        except (OSError, struct.error):
+            return None
+        if (magic != LM_MAGIC or fmt != 1 or n != len(grid.cells)
+                or crc != zlib.crc32(bytes(grid.cells))):
+            return None
+        tc, off = tc.decode("latin-1"), LM_HEADER.size
+        if tc not in FIELD_FAR or len(data) != off + 4*k + k*n*array(tc).itemsize:
+            return None     # unknown field type, or truncated/padded tables
+        ids = array('I'); ids.frombytes(data[off:off + 4*k]); off += 4*k
+        tables = []
+        for _ in range(k):
+            t = array(tc); t.frombytes(data[off:off + n*t.itemsize]); off += n*t.itemsize
+            tables.append(t)
+        return cls(grid, k, ids=ids, tables=tables)
+
+class ALT:
+    """Landmark heuristic for the engines; keeps the tables of the last grid."""
+    dynamic = True          # values follow the walls
+
+    def __init__(self, k=8):
+        self.k, self.lm = k, None
+
+    def landmarks(self, grid):
+        if self.lm is None or self.lm.grid is not grid:
+            self.lm = Landmarks(grid, self.k)
+        self.lm.sync()
+        return self.lm
+
+    def bind(self, grid, goal):
+        return self.landmarks(grid).bind(goal)
+
+#  Map files
+# Header: magic, format version, flags, rows, cols, start (r, c), goal (r, c);
+# then the padded cell layout as a wall bitset, LSB first within each byte.
+MAP_MAGIC  = b"A2MP"
+MAP_HEADER = struct.Struct("<4sHHIIiiii")
+_BIT_TABLES = [bytes((b >> k) & 1 for b in range(256)) for k in range(8)]
+_SET_TABLES = [bytes([0, 1 << k]) + bytes(254) for k in range(8)]
+
+def pack_bits(cells):
+    # eight strided passes, each a C-level translate, instead of a per-cell loop
+    m = (len(cells) + 7) // 8
+    cells = bytes(cells) + bytes(m*8 - len(cells))
+    word = 0
+    for k in range(8):
+        word |= int.from_bytes(cells[k::8].translate(_SET_TABLES[k]), "little")
+    return word.to_bytes(m, "little")
+
+def unpack_bits(bits, n):
+    out = bytearray(len(bits) * 8)
+    for k in range(8):
+        out[k::8] = bits.translate(_BIT_TABLES[k])
+    del out[n:]
+    return out
+
+class MapFile:
+    """A saved map opened through mmap; the header is read in place.
+
+    ``is_wall`` tests single cells straight from the mapped bitset, and
+    ``grid()`` expands the whole bitset into a FlatGrid.
+    """
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._check(path)
+        except ValueError:
+            self.mm.close()
+            raise
+
+    def _check(self, path):
+        if len(self.mm) < MAP_HEADER.size:
+            raise ValueError(f"{path}: not an A2 map file")
+        magic, fmt, _, rows, cols, sr, sc, gr, gc = MAP_HEADER.unpack_from(self.mm)
+        if magic != MAP_MAGIC or fmt != 1:
+            raise ValueError(f"{path}: not an A2 map file")
+        self.rows, self.cols = rows, cols
+        self.start, self.goal = (sr, sc), (gr, gc)
+        self.n = (rows + 2) * (cols + 2)
+        if len(self.mm) < MAP_HEADER.size + (self.n + 7) // 8:
+            raise ValueError(f"{path}: truncated map file")
+        for name, (r, c) in (("start", self.start), ("goal", self.goal)):
+            if not (0 <= r < rows and 0 <= c < cols) or self.is_wall(r, c):
+                raise ValueError(f"{path}: {name} {r, c} is outside the map or on a wall")
+
+    def is_wall(self, r, c):
+        i = (r+1)*(self.cols+2) + c+1
+        return self.mm[MAP_HEADER.size + (i >> 3)] >> (i & 7) & 1
+
+    def grid(self):
+        return FlatGrid(self.rows, self.cols, unpack_bits(self._bits(), self.n))
+
+    def bitgrid(self):
+        return BitGrid(self.rows, self.cols, self._bits())
+
+    def _bits(self):
+        off = MAP_HEADER.size
+        return self.mm[off:off + (self.n + 7) // 8]
+
+    def close(self):
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def save_map(path, grid, start, goal):
+    grid = as_grid(grid)
+    with open(path, "wb") as f:
+        f.write(MAP_HEADER.pack(MAP_MAGIC, 1, 0, grid.rows, grid.cols, *start, *goal))
+        f.write(grid.bits if isinstance(grid, BitGrid) else pack_bits(grid.cells))
+
+def load_map(path):
+    with MapFile(path) as mf:
+        return mf.grid(), mf.start, mf.goal
+
+#  Bit-packed grid
+class _BitView:
+    # read-only ``cells[i]`` over a bitset, so engines index it like a bytearray
+    __slots__ = ("bits", "n")
+
+    def __init__(self, bits, n):
+        self.bits, self.n = bits, n
+
+    def __getitem__(self, i):
+        return self.bits[i >> 3] >> (i & 7) & 1
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        return iter(unpack_bits(bytes(self.bits), self.n))
+
+    def __bytes__(self):
+        return bytes(unpack_bits(bytes(self.bits), self.n))
+
+def _bit_positions(x):
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
+class BitGrid(FlatGrid):
+    """FlatGrid's padded layout packed one bit per cell (bit i = wall at id i).
+
+    ``cells`` is a read-only bit view, so the search engines, neighbors()
+    and DStarLite run on it unchanged.  Bulk operations work a whole padded
+    row at a time as a Python int (bit j = padded column j), which is also
+    how jump_h finds the next wall or forced neighbour without stepping.
+    The bitset is the same one stored in map files.
+    """
+    def __init__(self, rows=ROWS, cols=COLS, bits=None):
+        self.rows, self.cols = rows, cols
+        self.stride  = s = cols + 2
+        n = (rows + 2) * s
+        self._rowcache = {}
+        if bits is not None:
+            self.bits = bytearray(bits)
+        else:
+            self.bits = bytearray(b"\xff") * ((n + 7) // 8)
+            for pr in range(1, rows + 1):
+                self._put_prow(pr, 1 | 1 << (s-1))
+        self.cells   = _BitView(self.bits, n)
+        self.offsets = (-s, s, -1, 1)
+        self.version = 0
+        self._log    = []
+        self._engine = None
+
+    @classmethod
+    def from_grid(cls, grid):
+        return cls(grid.rows, grid.cols, pack_bits(grid.cells))
+
+    @classmethod
+    def from_rows(cls, rows):
+        return cls.from_grid(FlatGrid.from_rows(rows))
+
+    def to_rows(self):
+        return [[self.row_bits(r) >> c & 1 for c in range(self.cols)]
+                for r in range(self.rows)]
+
+    def __setitem__(self, rc, v):
+        i, v = (rc[0]+1)*self.stride + rc[1]+1, 1 if v else 0
+        if self.cells[i] != v:
+            self.bits[i >> 3] ^= 1 << (i & 7)
+            self._rowcache.pop(rc[0]+1, None)
+            self._record((i,), v)
+
+    # Whole-row access (padded row pr, bit j = padded column j)
+    def _span(self, pr):
+        b0 = pr * self.stride
+        return b0 >> 3, ((b0 + self.stride - 1) >> 3) + 1, b0 & 7
+
+    def _prow(self, pr):
+        x = self._rowcache.get(pr)
+        if x is None:
+            lo, hi, sh = self._span(pr)
+            x = int.from_bytes(self.bits[lo:hi], "little") >> sh & ((1 << self.stride) - 1)
+            self._rowcache[pr] = x
+        return x
+
+    def _put_prow(self, pr, x):
+        lo, hi, sh = self._span(pr)
+        mask = ((1 << self.stride) - 1) << sh
+        span = int.from_bytes(self.bits[lo:hi], "little")
+        self.bits[lo:hi] = ((span & ~mask) | (x << sh)).to_bytes(hi - lo, "little")
+        self._rowcache[pr] = x
+
+    def row_bits(self, r):
+        return self._prow(r+1) >> 1 & ((1 << self.cols) - 1)
+
+    def row(self, r):
+        return unpack_bits(self.row_bits(r).to_bytes((self.cols+7) // 8, "little"), self.cols)
+
+    def next_wall(self, r, c, d=1):
+        # column of the first wall after c in direction d (-1 / cols for the border)
+        row = self._prow(r+1)
+        if d > 0:
+            ahead = row & (-1 << (c+2))
+            return (ahead & -ahead).bit_length() - 2
+        return (row & ((1 << (c+1)) - 1)).bit_length() - 2
+
+    def fill_rect(self, r0, c0, r1, c1, v=1):
+        # rows r0..r1-1, columns c0..c1-1
+        mask, ids = ((1 << (c1 - c0)) - 1) << (c0 + 1), []
+        for pr in range(r0 + 1, r1 + 1):
+            row = self._prow(pr)
+            new = row | mask if v else row & ~mask
+            ids.extend(pr*self.stride + j for j in _bit_positions(row ^ new))
+            self._put_prow(pr, new)
+        if ids: self._record(ids, 1 if v else 0)
+
+    def clear_rect(self, r0, c0, r1, c1):
+        self.fill_rect(r0, c0, r1, c1, 0)
+
+    def random_fill_ids(self, density, rng=None, exclude=()):
+        # Each free cell becomes a wall with P(density), 16-bit resolution:
+        # AND/OR-ing random words along the bits of p builds a whole row's
+        # mask from 16 getrandbits calls.
+        p = min(65536, round(density * 65536))
+        if p <= 0: return []
+        rng, s, changed = make_rng(rng), self.stride, []
+        skip = {}
+        for rc in exclude:
+            if rc: skip[rc[0]+1] = skip.get(rc[0]+1, 0) | 1 << (rc[1]+1)
+        for pr in range(1, self.rows + 1):
+            if p == 65536:
+                m = (1 << s) - 1
+            else:
+                m = 0
+                for k in range(16):
+                    m = m | rng.getrandbits(s) if p >> k & 1 else m & rng.getrandbits(s)
+            row = self._prow(pr)
+            new = m & ~row & ~skip.get(pr, 0)
+            if not new: continue
+            self._put_prow(pr, row | new)
+            changed.extend(pr*s + j for j in _bit_positions(new))
+        if changed: self._record(changed, 1)
+        return changed
+
+    def jump_h(self, n, d, goal):
+        s = self.stride
+        pr, c = divmod(n, s)
+        row, up, dn = self._prow(pr), self._prow(pr-1), self._prow(pr+1)
+        gr, gc = divmod(goal, s)
+        if d > 0:
+            forced = (~up & (up << 1)) | (~dn & (dn << 1))
+            ahead = row & (-1 << (c+1))
+            w = (ahead & -ahead).bit_length() - 1
+            f = forced & (-1 << (c+1)) & ((1 << w) - 1)
+            stop = (f & -f).bit_length() - 1 if f else w
+            if gr == pr and c < gc < stop: stop = gc
+        else:
+            forced = (~up & (up >> 1)) | (~dn & (dn >> 1))
+            w = (row & ((1 << c) - 1)).bit_length() - 1
+            f = forced & ((1 << c) - 1) & (-1 << (w+1))
+            stop = f.bit_length() - 1 if f else w
+            if gr == pr and stop < gc < c: stop = gc
+        return -1 if stop == w else pr*s + stop
+
+#  Shared-memory grid
+class SharedGrid(FlatGrid):
+    """FlatGrid whose cells live in a multiprocessing SharedMemory block.
+
+    Block layout: a 16-byte header (version, rows, cols) followed by the
+    padded cells, so ``SharedGrid.attach(name)`` maps the same bytes in
+    another process without copying.  Wall edits bump the shared version,
+    which readers can compare to notice changes.  Pickling a SharedGrid
+    sends only the block name.  The creating process should ``unlink()``
+    it when done; every process should ``close()`` its handle.
+    """
+    HEADER = 16
+
+    def __init__(self, rows=ROWS, cols=COLS, cells=None, name=None):
+        self.rows, self.cols = rows, cols
+        self.stride = cols + 2
+        n = (rows + 2) * self.stride
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.HEADER + n)
+            self.shm.buf[self.HEADER:self.HEADER+n] = (
+                FlatGrid(rows, cols).cells if cells is None else cells)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self._head = self.shm.buf[:self.HEADER].cast('Q')
+        if name is None:
+            self._head[0], self._head[1] = 0, rows << 32 | cols
+        self.cells   = self.shm.buf[self.HEADER:self.HEADER+n]
+        self.offsets = (-self.stride, self.stride, -1, 1)
+        self._log    = []
+        self._engine = None
+
+    @classmethod
+    def from_grid(cls, grid):
+        return cls(grid.rows, grid.cols, grid.cells)
+
+    @classmethod
+    def attach(cls, name):
+        shm = shared_memory.SharedMemory(name=name)
+        size = shm.buf[8:16].cast('Q')[0]
+        shm.close()
+        return cls(size >> 32, size & 0xFFFFFFFF, name=name)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def version(self):
+        return self._head[0]
+
+    @version.setter
+    def version(self, v):
+        self._head[0] = v
+
+    def __reduce__(self):
+        return SharedGrid.attach, (self.shm.name,)
+
+    def close(self):
+        self._engine = None
+        self.cells.release(); self._head.release()
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+#  Open list
+class BucketQueue:
+    """Open list of node ids with decrease-key, one bucket per f value.
+
+    Costs are small integers, so many nodes share an f and each bucket is
+    a plain list popped from the end (LIFO ties, which favour the deeper
+    node).  A heap of the distinct keys finds the smallest bucket, so float
+    keys work too.  ``key`` and ``slot`` say where an open node sits and are
+    only meaningful while the caller's stamps mark it open; clear() just
+    drops the buckets.
+    """
+    __slots__ = ("buckets", "keys", "key", "slot")
+
+    def __init__(self, n):
+        self.buckets, self.keys = {}, []   # a key is in keys iff in buckets
+        self.key  = array('d', bytes(8*n))
+        self.slot = array('i', bytes(4*n))
+
+    def clear(self):
+        self.buckets.clear(); self.keys.clear()
+
+    def push(self, n, k):
+        b = self.buckets.get(k)
+        if b is None:
+            self.buckets[k] = [n]; heapq.heappush(self.keys, k); self.slot[n] = 0
+        else:
+            self.slot[n] = len(b); b.append(n)
+        self.key[n] = k
+
+    def decrease(self, n, k):
+        # move open node n to the smaller key k
+        b = self.buckets[self.key[n]]
+        last = b.pop()
+        if last != n:
+            i = self.slot[n]; b[i] = last; self.slot[last] = i
+        self.push(n, k)
+
+    def pop(self):
+        # smallest-key node, or -1 when empty
+        buckets, keys = self.buckets, self.keys
+        while keys:
+            b = buckets[keys[0]]
+            if b: return b.pop()
+            del buckets[heapq.heappop(keys)]
+        return -1
+
+#  Search engine (preallocated buffers)
+class SearchEngine:
+    """A*/GBFS over one grid with g-costs, parents and stamps kept in arrays.
+
+    ``stamp[i] == gen`` means i is open/seen in the current search and
+    ``gen + 1`` means closed; older values are leftovers from previous
+    searches, so starting a new query is just ``gen += 2``.
+    """
+    def __init__(self, grid):
+        n = len(grid.cells)
+        self.grid   = grid
+        self.g      = array('i', bytes(4*n))
+        self.parent = array('i', bytes(4*n))
+        self.stamp  = array('I', bytes(4*n))
+        self.gen    = 0
+        self.open   = BucketQueue(n)   # open list of astar/gbfs
+        self.back   = None  # (g, parent, stamp) of the backward search
+        self.probe  = None  # Probe instrumenting astar/gbfs, when profiling
+
+    def _next_gen(self):
+        self.gen += 2
+        if self.gen >= 0xFFFFFFFE:   # wrapped: clear once and start over
+            self.stamp = array('I', bytes(4*len(self.stamp)))
+            self.back = None
+            self.gen = 2
+        return self.gen
+
+    def _backward(self):
+        if self.back is None:
+            n = len(self.stamp)
+            self.back = (array('i', bytes(4*n)), array('i', bytes(4*n)),
+                         array('I', bytes(4*n)))
+        return self.back
+
+    def path(self, goal):
+        parent, path, node = self.parent, [], goal
+        while node != -1:
+            path.append(node); node = parent[node]
+        path.reverse()
+        return path
+
+    def astar(self, start, goal, h, weight=1):
+        return _collect(self.astar_iter(start, goal, h, weight=weight))
+
+    def astar_iter(self, start, goal, h, batch=VISIT_BATCH, weight=1):
+        # yields lists of up to batch expanded ids; returns the path or None.
+        # weight > 1 is weighted A*: f = g + weight*h, cost <= weight*optimal
+        if unreachable(self.grid, start, goal):
+            return None
+        cells, offs = self.grid.cells, self.grid.offsets
+        g, parent, stamp = self.g, self.parent, self.stamp
+        gen = self._next_gen(); done = gen + 1
+        probe = self.probe
+        if probe: probe.phase("heuristic")
+        hf = id_heuristic(self.grid, h, goal)
+        if weight != 1:
+            base = hf
+            hf = lambda i: weight * base(i)
+        q = self.open; q.clear()
+        pop, push, decrease = q.pop, q.push, q.decrease
+        if probe:
+            hf, pop, push, decrease = probe.hook(hf, pop, push, decrease)
+            cells = probe.cells(cells)
+            probe.phase("search")
+        g[start] = 0; parent[start] = -1; stamp[start] = gen
+        push(start, hf(start))
+        expanded = []
+        while True:
+            cur = pop()
+            if cur == -1: break
+            stamp[cur] = done
+            expanded.append(cur)
+            if cur == goal:
+                yield expanded
+                if probe: probe.phase("path")
+                return self.path(goal)
+            if len(expanded) >= batch:
+                yield expanded
+                expanded = []
             ng = g[cur] + 1
-            if nb not in g or ng < g[nb]:
-                g[nb] = ng; cf[nb] = cur; counter += 1
-                heapq.heappush(heap, (ng + h(nb, goal), counter, nb))
-    return None, visited_order, len(visited_order)
+            for d in offs:
+                nb = cur + d
+                if cells[nb]: continue
+                s = stamp[nb]
+                if s < gen:
+                    stamp[nb] = gen; g[nb] = ng; parent[nb] = cur
+                    push(nb, ng + hf(nb))
+                elif ng < g[nb]:
+                    # closed nodes (only with weight > 1) keep their place
+                    g[nb] = ng; parent[nb] = cur
+                    if s == gen: decrease(nb, ng + hf(nb))
+        if expanded: yield expanded
+        return None
 
-def run_gbfs(grid, start, goal, h):
-    counter = 0
-    heap = [(h(start, goal), 0, start)]
-    cf = {start: None}
-    seen = {start}
+    def bidir(self, start, goal, h):
+        # Bidirectional A*, front-to-end: each side aims at the other's root
+        # and the sides take turns.  mu is the cheapest start-goal cost seen
+        # where the two searches touch; once either side's smallest f
+        # reaches mu nothing cheaper is left, so mu is optimal.
+        if unreachable(self.grid, start, goal):
+            return None, [], 0
+        cells, offs = self.grid.cells, self.grid.offsets
+        if start == goal:
+            return [start], [start], 1
+        gen = self._next_gen(); done = gen + 1
+        gb, pb, sb = self._backward()
+        sides = [(self.g, self.parent, self.stamp, id_heuristic(self.grid, h, goal), []),
+                 (gb, pb, sb, id_heuristic(self.grid, h, start), [])]
+        for root, (g, parent, stamp, hf, heap) in zip((start, goal), sides):
+            g[root] = 0; parent[root] = -1; stamp[root] = gen
+            heap.append((hf(root), 0, root))
+        pop, push = heapq.heappop, heapq.heappush
+        mu, meet, counter, turn = math.inf, -1, 0, 0
+        visited_order = []
+        while True:
+            for _, _, stamp, _, heap in sides:
+                while heap and stamp[heap[0][2]] == done: pop(heap)
+            if not sides[0][4] or not sides[1][4]: break
+            if max(sides[0][4][0][0], sides[1][4][0][0]) >= mu: break
+            g, parent, stamp, hf, heap = sides[turn]
+            og, _, ostamp, _, _ = sides[turn ^ 1]
+            turn ^= 1
+            cur = pop(heap)[2]
+            stamp[cur] = done
+            visited_order.append(cur)
+            ng = g[cur] + 1
+            for d in offs:
+                nb = cur + d
+                if cells[nb]: continue
+                if stamp[nb] < gen:
+                    stamp[nb] = gen
+                elif ng >= g[nb]:
+                    continue
+                g[nb] = ng; parent[nb] = cur; counter += 1
+                push(heap, (ng + hf(nb), counter, nb))
+                if ostamp[nb] >= gen and ng + og[nb] < mu:
+                    mu, meet = ng + og[nb], nb
+        if meet == -1:
+            return None, visited_order, len(visited_order)
+        path, node = self.path(meet), pb[meet]
+        while node != -1:
+            path.append(node); node = pb[node]
+        return path, visited_order, len(visited_order)
+
+    def gbfs(self, start, goal, h):
+        return _collect(self.gbfs_iter(start, goal, h))
+
+    def gbfs_iter(self, start, goal, h, batch=VISIT_BATCH):
+        if unreachable(self.grid, start, goal):
+            return None
+        cells, offs = self.grid.cells, self.grid.offsets
+        parent, stamp = self.parent, self.stamp
+        gen = self._next_gen()
+        probe = self.probe
+        if probe: probe.phase("heuristic")
+        hf = id_heuristic(self.grid, h, goal)
+        q = self.open; q.clear()
+        pop, push = q.pop, q.push
+        if probe:
+            hf, pop, push, _ = probe.hook(hf, pop, push, q.decrease)
+            cells = probe.cells(cells)
+            probe.phase("search")
+        parent[start] = -1; stamp[start] = gen
+        push(start, hf(start))
+        expanded = []
+        while True:
+            cur = pop()
+            if cur == -1: break
+            expanded.append(cur)
+            if cur == goal:
+                yield expanded
+                if probe: probe.phase("path")
+                return self.path(goal)
+            if len(expanded) >= batch:
+                yield expanded
+                expanded = []
+            for d in offs:
+                nb = cur + d
+                if cells[nb] or stamp[nb] >= gen: continue
+                stamp[nb] = gen; parent[nb] = cur
+                push(nb, hf(nb))
+        if expanded: yield expanded
+        return None
+
+    def jps(self, start, goal, h):
+        if unreachable(self.grid, start, goal):
+            return None, [], 0
+        # 4-connected jump point search.  Canonical paths turn vertical as
+        # early as possible, so a horizontal run may only turn at a forced
+        # neighbour while a vertical run may turn anywhere (it scans both
+        # rows sideways and stops where a scan finds something).
+        grid = self.grid
+        cells, s, jump_h = grid.cells, grid.stride, grid.jump_h
+        probe = self.probe
+        if probe: cells, jump_h = probe.cells(cells), probe.helper("jump_h", jump_h)
+        jump_v = partial(_jump_v, cells, jump_h)
+        if probe: jump_v = probe.helper("jump_v", jump_v)
+        g, parent, stamp = self.g, self.parent, self.stamp
+        gen = self._next_gen(); done = gen + 1
+        hf = id_heuristic(grid, h, goal)
+        pop, push = heapq.heappop, heapq.heappush
+        g[start] = 0; parent[start] = -1; stamp[start] = gen
+        counter = 0
+        heap = [(hf(start), 0, start)]
+        visited_order = []
+        while heap:
+            _, _, cur = pop(heap)
+            if stamp[cur] == done: continue
+            stamp[cur] = done
+            visited_order.append(cur)
+            if cur == goal:
+                return _fill_path(self.path(goal), s), visited_order, len(visited_order)
+            p = parent[cur]
+            if p == -1:
+                succ = [jump_h(cur, 1, goal), jump_h(cur, -1, goal),
+                        jump_v(cur, s, goal), jump_v(cur, -s, goal)]
+            elif abs(cur - p) < s:
+                d = 1 if cur > p else -1
+                succ = [jump_h(cur, d, goal)]
+                for v in (-s, s):
+                    if not cells[cur+v] and cells[cur-d+v]:
+                        succ.append(jump_v(cur, v, goal))
+            else:
+                v = s if cur > p else -s
+                succ = [jump_v(cur, v, goal),
+                        jump_h(cur, 1, goal), jump_h(cur, -1, goal)]
+            for nb in succ:
+                if nb == -1: continue
+                dist = abs(nb - cur)
+                ng = g[cur] + (dist if dist < s else dist // s)
+                if stamp[nb] < gen:
+                    stamp[nb] = gen
+                elif ng >= g[nb]:
+                    continue
+                g[nb] = ng; parent[nb] = cur; counter += 1
+                push(heap, (ng + hf(nb), counter, nb))
+        return None, visited_order, len(visited_order)
+
+#  Jump point helpers (4-connected)
+def _jump_v(cells, jump_h, n, v, goal):
+    while True:
+        n += v
+        if cells[n]: return -1
+        if n == goal: return n
+        if jump_h(n, 1, goal) != -1 or jump_h(n, -1, goal) != -1:
+            return n
+
+def _fill_path(jumps, s):
+    path = jumps[:1]
+    for a, b in zip(jumps, jumps[1:]):
+        step = (1 if abs(b - a) < s else s) * (1 if b > a else -1)
+        path.extend(range(a + step, b + step, step))
+    return path
+
+def _collect(search):
+    # run a streaming search to the end, as (path, visited_order, nodes_expanded)
     visited_order = []
+    while True:
+        try:
+            visited_order += next(search)
+        except StopIteration as stop:
+            return stop.value, visited_order, len(visited_order)
+
+def engine_for(grid):
+    if grid._engine is None:
+        grid._engine = SearchEngine(grid)
+    return grid._engine
+
+#  Search algo (node ids)
+def astar_ids(grid, start, goal, h, weight=1):
+    return engine_for(grid).astar(start, goal, h, weight)
+
+def bidir_ids(grid, start, goal, h):
+    return engine_for(grid).bidir(start, goal, h)
+
+def gbfs_ids(grid, start, goal, h):
+    return engine_for(grid).gbfs(start, goal, h)
+
+def jps_ids(grid, start, goal, h):
+    return engine_for(grid).jps(start, goal, h)
+
+#  Search algo (tuple adapters for the app)
+def run_astar(grid, start, goal, h):
+    grid = as_grid(grid)
+    return _as_cells(grid, astar_ids(grid, grid.id(*start), grid.id(*goal), h))
+
+def run_bidir(grid, start, goal, h):
+    grid = as_grid(grid)
+    return _as_cells(grid, bidir_ids(grid, grid.id(*start), grid.id(*goal), h))
+
+def run_gbfs(grid, start, goal, h):
+    grid = as_grid(grid)
+    return _as_cells(grid, gbfs_ids(grid, grid.id(*start), grid.id(*goal), h))
+
+def run_jps(grid, start, goal, h):
+    grid = as_grid(grid)
+    return _as_cells(grid, jps_ids(grid, grid.id(*start), grid.id(*goal), h))
+
+#  Instrumentation (opt-in)
+class _CountedCells:
+    # read-only view of grid.cells that counts every wall test
+    __slots__ = ("cells", "probe")
+
+    def __init__(self, cells, probe):
+        self.cells, self.probe = cells, probe
+
+    def __getitem__(self, i):
+        self.probe.checks += 1
+        return self.cells[i]
+
+class Probe:
+    """Counters and a phase timer for the search engine.
+
+    While ``engine.probe`` holds one, A* and GBFS swap their open-list and
+    heuristic calls for counting wrappers and mark their phases; they, JPS
+    and neighbors() read the walls through a counting view, and JPS counts
+    its jump helpers.  With no probe the loops run untouched.
+    """
+    def __init__(self):
+        self.pushes = self.pops = self.decreases = self.h_calls = self.peak_open = 0
+        self.checks, self.calls = 0, {}
+        self.phases, self._phase, self._t = {}, None, 0.0
+
+    def cells(self, cells):
+        return _CountedCells(cells, self)
+
+    def helper(self, name, fn):
+        calls = self.calls
+        def counted(*args):
+            calls[name] = calls.get(name, 0) + 1
+            return fn(*args)
+        return counted
+
+    def hook(self, hf, pop, push, decrease):
+        def counted_hf(i):
+            self.h_calls += 1
+            return hf(i)
+        def counted_pop():
+            n = pop()
+            if n != -1: self.pops += 1
+            return n
+        def counted_push(n, k):
+            self.pushes += 1
+            push(n, k)
+            if self.pushes - self.pops > self.peak_open:
+                self.peak_open = self.pushes - self.pops
+        def counted_decrease(n, k):
+            self.decreases += 1
+            decrease(n, k)
+        return counted_hf, counted_pop, counted_push, counted_decrease
+
+    def phase(self, name=None):
+        # close the running phase and start name (None just closes)
+        now = time.perf_counter()
+        if self._phase:
+            self.phases[self._phase] = self.phases.get(self._phase, 0.0) + now - self._t
+        self._phase, self._t = name, now
+
+def profile(fn, grid, start, goal, h, capture=None):
+    """Run fn(grid, start, goal, h) once with a Probe on the grid's engine.
+
+    Returns (result, report); the report is a plain dict, ready for JSON.
+    Heap and heuristic counters are filled in for A* and GBFS only;
+    neighbor_checks also for JPS, which adds its helper_calls.
+    capture="cprofile" adds the top functions by cumulative time and
+    capture="tracemalloc" the allocation peak and top allocating lines.
+    """
+    grid = as_grid(grid)
+    engine = engine_for(grid)
+    probe = engine.probe = Probe()
+    prof = cProfile.Profile() if capture == "cprofile" else None
+    if capture == "tracemalloc": tracemalloc.start()
+    if prof: prof.enable()
+    t0 = time.perf_counter()
+    try:
+        result = fn(grid, start, goal, h)
+    finally:
+        total = time.perf_counter() - t0
+        if prof: prof.disable()
+        engine.probe = None
+        probe.phase()
+    path, _, ne = result
+    report = dict(expanded=ne, cost=len(path) - 1 if path else None,
+                  total_ms=round(total * 1000, 3),
+                  phases_ms={k: round(v * 1000, 3) for k, v in probe.phases.items()})
+    if probe.pops:
+        report.update(pushes=probe.pushes, pops=probe.pops, decreases=probe.decreases,
+                      heuristic_calls=probe.h_calls, peak_open=probe.peak_open)
+    if probe.checks: report["neighbor_checks"] = probe.checks
+    if probe.calls: report["helper_calls"] = dict(probe.calls)
+    if prof:
+        stats = pstats.Stats(prof).stats
+        top = sorted(stats.items(), key=lambda kv: kv[1][3], reverse=True)[:15]
+        report["cprofile"] = [dict(function=f"{os.path.basename(f)}:{line}({name})",
+                                   calls=nc, tottime_ms=round(tt * 1000, 3),
+                                   cumtime_ms=round(ct * 1000, 3))
+                              for (f, line, name), (_, nc, tt, ct, _) in top]
+    if capture == "tracemalloc":
+        peak = tracemalloc.get_traced_memory()[1]
+        lines = tracemalloc.take_snapshot().statistics("lineno")[:10]
+        tracemalloc.stop()
+        report["tracemalloc"] = dict(
+            peak_kb=round(peak / 1024, 1),
+            top=[dict(line=str(s.traceback[0]), kb=round(s.size / 1024, 1), count=s.count)
+                 for s in lines])
+    return result, report
+
+#  Streaming search (expansion batches as they happen)
+def _iter_cells(grid, search):
+    # cell view of an id search; returns (path, nodes_expanded)
+    pos, ne = grid.pos, 0
+    while True:
+        try:
+            batch = next(search)
+        except StopIteration as stop:
+            return ([pos(i) for i in stop.value] if stop.value else None), ne
+        ne += len(batch)
+        yield [pos(i) for i in batch]
+
+def run_astar_iter(grid, start, goal, h, batch=VISIT_BATCH, weight=1):
+    grid = as_grid(grid)
+    engine = engine_for(grid)
+    return (yield from _iter_cells(grid, engine.astar_iter(grid.id(*start), grid.id(*goal),
+                                                          h, batch, weight)))
+
+def run_gbfs_iter(grid, start, goal, h, batch=VISIT_BATCH):
+    grid = as_grid(grid)
+    engine = engine_for(grid)
+    return (yield from _iter_cells(grid, engine.gbfs_iter(grid.id(*start), grid.id(*goal), h, batch)))
+
+def chunked(fn, *args, batch=VISIT_BATCH):
+    # stream any (path, visited_order, nodes_expanded) search; fn only runs
+    # once the generator is first advanced
+    path, vis, ne = fn(*args)
+    for i in range(0, len(vis), batch):
+        yield vis[i:i+batch]
+    return path, ne
+
+def stream(alg, grid, start, goal, h, batch=VISIT_BATCH, **opts):
+    # opts are algorithm settings such as weight= or budget_ms=
+    if alg in STREAMS:
+        return STREAMS[alg](grid, start, goal, h, batch, **opts)
+    return chunked(partial(ALGORITHMS[alg], **opts), grid, start, goal, h, batch=batch)
+
+#  Hierarchical search (HPA*)
+CLUSTER = 10
+
+class HPAGraph:
+    """Cluster abstraction of a grid for hierarchical (HPA*) queries.
+
+    The grid is cut into size x size clusters.  Each run of free cells
+    along a border between two clusters becomes one transition (two for
+    long runs).  Its two cells are abstract nodes, linked by a step of
+    cost 1.  Nodes of the same cluster are joined by their in-cluster
+    BFS distance.  Queries search this small graph and only expand it
+    into cells (refine) at the end.  sync() re-abstracts just the
+    clusters that wall edits touched.  Paths are near-optimal, not
+    optimal, because routes stay inside clusters between transitions.
+    """
+    def __init__(self, grid, size=CLUSTER):
+        self.grid, self.size, self.version = grid, size, grid.version
+        self.crows = -(-grid.rows // size)
+        self.ccols = -(-grid.cols // size)
+        self.inter = {}     # border key -> [(a, b), ...] transitions
+        self.links = {}     # node -> nodes one step away across a border
+        self.intra = {}     # cluster -> {node: {node: in-cluster distance}}
+        for cr in range(self.crows):
+            for cc in range(self.ccols):
+                for key in (("h", cr, cc), ("v", cr, cc)):
+                    self._scan_border(key)
+        for cr in range(self.crows):
+            for cc in range(self.ccols):
+                self._connect((cr, cc))
+
+    def cluster_of(self, i):
+        r, c = self.grid.pos(i)
+        return r // self.size, c // self.size
+
+    def _borders(self, cl):
+        cr, cc = cl
+        keys = [("h", cr, cc), ("v", cr, cc), ("h", cr, cc-1), ("v", cr-1, cc)]
+        return [k for k in keys if k in self.inter]
+
+    def _scan_border(self, key):
+        kind, cr, cc = key
+        grid, K, cells = self.grid, self.size, self.grid.cells
+        if kind == "h":     # between (cr, cc) and (cr, cc+1)
+            if cc + 1 >= self.ccols: return
+            x = (cc+1)*K - 1
+            pairs = [(grid.id(r, x), grid.id(r, x+1))
+                     for r in range(cr*K, min((cr+1)*K, grid.rows))]
+        else:               # between (cr, cc) and (cr+1, cc)
+            if cr + 1 >= self.crows: return
+            y = (cr+1)*K - 1
+            pairs = [(grid.id(y, c), grid.id(y+1, c))
+                     for c in range(cc*K, min((cc+1)*K, grid.cols))]
+        for a, b in self.inter.pop(key, ()):
+            self.links[a].discard(b); self.links[b].discard(a)
+        trans, run = [], []
+        for a, b in pairs + [(None, None)]:
+            if a is not None and not cells[a] and not cells[b]:
+                run.append((a, b)); continue
+            if run:
+                trans += [run[len(run)//2]] if len(run) < 6 else [run[0], run[-1]]
+                run = []
+        self.inter[key] = trans
+        for a, b in trans:
+            self.links.setdefault(a, set()).add(b)
+            self.links.setdefault(b, set()).add(a)
+
+    def _nodes(self, cl):
+        return {n for k in self._borders(cl) for pair in self.inter[k]
+                for n in pair if self.cluster_of(n) == cl}
+
+    def _connect(self, cl):
+        nodes = self._nodes(cl)
+        self.intra[cl] = {n: self._local(n, cl, nodes)[0] for n in nodes}
+
+    def _local(self, src, cl, targets=None):
+        # BFS from src that stays inside cluster cl; (dist, parent) dicts
+        # for the targets reached (every cell when targets is None)
+        grid, K = self.grid, self.size
+        cells, offs, s = grid.cells, grid.offsets, grid.stride
+        r0, c0 = cl[0]*K + 1, cl[1]*K + 1      # padded bounds
+        r1, c1 = min(r0 + K, grid.rows + 1), min(c0 + K, grid.cols + 1)
+        dist, parent, frontier = {src: 0}, {src: None}, [src]
+        while frontier:
+            nxt = []
+            for u in frontier:
+                for o in offs:
+                    v = u + o
+                    if cells[v] or v in dist: continue
+                    r, c = divmod(v, s)
+                    if r0 <= r < r1 and c0 <= c < c1:
+                        dist[v] = dist[u] + 1; parent[v] = u; nxt.append(v)
+            frontier = nxt
+        if targets is not None:
+            dist = {t: dist[t] for t in targets if t in dist and t != src}
+        return dist, parent
+
+    def sync(self):
+        grid, v = self.grid, self.grid.version
+        if v == self.version: return
+        changes = grid.changes_since(self.version, v)
+        if changes is None:
+            self.__init__(grid, self.size)
+            return
+        touched = {self.cluster_of(i) for i, _ in changes}
+        keys = {k for cl in touched for k in self._borders(cl)}
+        for k in keys: self._scan_border(k)
+        dirty = set(touched)
+        for kind, cr, cc in keys:
+            dirty.add((cr, cc)); dirty.add((cr, cc+1) if kind == "h" else (cr+1, cc))
+        for cl in dirty: self._connect(cl)
+        self.version = v
+
+    def search(self, start, goal, h=manhattan):
+        # A* over the abstract graph with start and goal spliced in; returns
+        # (abstract path or None, expanded abstract nodes)
+        self.sync()
+        if self.grid.cells[goal]: return None, []
+        cs, cg = self.cluster_of(start), self.cluster_of(goal)
+        targets = self._nodes(cs) | ({goal} if cs == cg else set())
+        out_start = self._local(start, cs, targets)[0]
+        into_goal = self._local(goal, cg, self._nodes(cg))[0]
+        hf = id_heuristic(self.grid, h, goal)
+        g, parent, closed = {start: 0}, {start: None}, set()
+        heap, counter, visited_order = [(hf(start), 0, start)], 0, []
+        while heap:
+            _, _, u = heapq.heappop(heap)
+            if u in closed: continue
+            closed.add(u)
+            visited_order.append(u)
+            if u == goal:
+                return rebuild_path(parent, goal), visited_order
+            succ = list((out_start if u == start else self.intra[self.cluster_of(u)].get(u, {})).items())
+            succ += [(v, 1) for v in self.links.get(u, ())]
+            if u in into_goal: succ.append((goal, into_goal[u]))
+            for v, cost in succ:
+                ng = g[u] + cost
+                if v not in g or ng < g[v]:
+                    g[v] = ng; parent[v] = u; counter += 1
+                    heapq.heappush(heap, (ng + hf(v), counter, v))
+        return None, visited_order
+
+    def refine(self, abstract):
+        # lazily expand an abstract path into cells, one hop at a time
+        s = self.grid.stride
+        yield abstract[0]
+        for a, b in zip(abstract, abstract[1:]):
+            if abs(b - a) in (1, s):
+                yield b; continue
+            parent = self._local(a, self.cluster_of(a))[1]
+            seg, n = [], b
+            while n != a:
+                seg.append(n); n = parent[n]
+            yield from reversed(seg)
+
+def hpa_for(grid, size=CLUSTER):
+    if grid._hpa is None or grid._hpa.size != size:
+        grid._hpa = HPAGraph(grid, size)
+    return grid._hpa
+
+def hpa_ids(grid, start, goal, h):
+    # path is a lazy refine() generator; callers pull cells as they need them
+    if unreachable(grid, start, goal):
+        return None, [], 0
+    hpa = hpa_for(grid)
+    abstract, visited_order = hpa.search(start, goal, h)
+    path = hpa.refine(abstract) if abstract else None
+    return path, visited_order, len(visited_order)
+
+def run_hpa(grid, start, goal, h):
+    grid = as_grid(grid)
+    path, vis, ne = hpa_ids(grid, grid.id(*start), grid.id(*goal), h)
+    return _as_cells(grid, (path and list(path), vis, ne))
+
+#  Anytime search (ARA*)
+class ARAStar:
+    """Anytime repairing A*: weighted A* passes with a shrinking weight.
+
+    Each pass reuses the g-values of the previous ones.  Nodes improved
+    after being closed wait in ``incons`` and only rejoin the open list for
+    the next pass, so later passes re-expand little.  improve(budget_ms)
+    resumes where the last call stopped, even in the middle of a pass, and
+    returns the improvements it found as (path, cost, bound) tuples, where
+    cost <= bound * optimal cost.
+    """
+    def __init__(self, grid, start, goal, h, eps=3.0, step=0.5):
+        self.grid = grid = as_grid(grid)
+        self.start, self.goal = grid.id(*start), grid.id(*goal)
+        self.hf = id_heuristic(grid, h, self.goal)
+        self.eps, self.step = max(1.0, eps), step
+        self.g, self.parent = {self.start: 0}, {self.start: None}
+        self.open, self.in_open, self.closed, self.incons = [], set(), set(), set()
+        self.counter, self.visited_order = 0, []
+        self.path, self.cost, self.bound = None, math.inf, math.inf
+        self.done = unreachable(grid, self.start, self.goal)
+        self._push(self.start)
+
+    def _f(self, n):
+        return self.g[n] + self.eps * self.hf(n)
+
+    def _push(self, n):
+        self.counter += 1
+        heapq.heappush(self.open, (self._f(n), self.counter, n))
+        self.in_open.add(n)
+
+    def _improve_path(self, deadline):
+        # one weighted pass; False if the deadline cut it short
+        cells, offs = self.grid.cells, self.grid.offsets
+        g, parent, heap = self.g, self.parent, self.open
+        in_open, closed, incons = self.in_open, self.closed, self.incons
+        pop, goal, n = heapq.heappop, self.goal, 0
+        while heap:
+            f, _, cur = heap[0]
+            if cur not in in_open or f != self._f(cur):
+                pop(heap); continue             # stale entry
+            if f >= g.get(goal, math.inf): return True
+            n += 1
+            if n & 255 == 0 and time.perf_counter() > deadline: return False
+            pop(heap)
+            in_open.discard(cur); closed.add(cur)
+            self.visited_order.append(cur)
+            ng = g[cur] + 1
+            for d in offs:
+                nb = cur + d
+                if cells[nb] or ng >= g.get(nb, math.inf): continue
+                g[nb] = ng; parent[nb] = cur
+                if nb in closed: incons.add(nb)
+                else:            self._push(nb)
+        return True
+
+    def improve(self, budget_ms):
+        deadline = time.perf_counter() + budget_ms / 1000
+        found = []
+        while not self.done:
+            if not self._improve_path(deadline): break
+            if self.goal in self.g:
+                # parents may already point along shorter routes than g(goal)
+                path = rebuild_path(self.parent, self.goal)
+                cost = len(path) - 1
+                # g + h of anything still open or inconsistent bounds the optimum
+                lower = min((self.g[n] + self.hf(n) for n in self.in_open | self.incons),
+                            default=cost)
+                bound = min(self.eps, cost / lower) if lower else 1.0
+                if cost < self.cost or bound < self.bound:
+                    self.path, self.cost, self.bound = path, cost, bound
+                    pos = self.grid.pos
+                    found.append(([pos(i) for i in self.path], cost, bound))
+            if self.eps <= 1.0 or self.bound <= 1.0:
+                self.done = True; break
+            self.eps = max(1.0, self.eps - self.step)
+            nodes = self.in_open | self.incons
+            self.open, self.in_open, self.incons = [], set(), set()
+            self.closed.clear()
+            for n in nodes: self._push(n)
+        return found
+
+def run_wastar(grid, start, goal, h, weight=WEIGHT):
+    grid = as_grid(grid)
+    return _as_cells(grid, astar_ids(grid, grid.id(*start), grid.id(*goal), h, weight))
+
+def run_ara(grid, start, goal, h, budget_ms=ARA_BUDGET_MS, eps=3.0, log=None, keep=None):
+    # best ARA* path found within budget_ms; log collects (path, cost, bound).
+    # keep is a dict holding the search between calls: the same query on an
+    # unchanged grid resumes it and visited lists only the new expansions.
+    grid = as_grid(grid)
+    key = (grid, grid.version, start, goal, h, eps)
+    if keep is not None and keep.get("key") == key:
+        ara = keep["ara"]
+    else:
+        ara = ARAStar(grid, start, goal, h, eps)
+        if keep is not None: keep.update(key=key, ara=ara)
+    seen = len(ara.visited_order)
+    found = ara.improve(budget_ms)
+    if log is not None: log.extend(found)
+    pos = grid.pos
+    path = [pos(i) for i in ara.path] if ara.path else None
+    return path, [pos(i) for i in ara.visited_order[seen:]], len(ara.visited_order)
+
+ALGORITHMS = {"A*": run_astar, "Bi-A*": run_bidir, "WA*": run_wastar, "ARA*": run_ara,
+              "GBFS": run_gbfs, "JPS": run_jps, "HPA*": run_hpa}
+STREAMS    = {"A*": run_astar_iter, "WA*": partial(run_astar_iter, weight=WEIGHT),
+              "GBFS": run_gbfs_iter}
+HEURISTICS = {"Manhattan": manhattan, "Euclidean": euclidean,
+              "Exact": TrueDistance(), "ALT": ALT()}
+
+#  Path cache
+class PathCache:
+    """LRU cache of search results (path first) keyed by (start, goal, algorithm, heuristic).
+
+    Each entry remembers the grid and version it was solved on.  A lookup
+    on a newer version replays changes_since(): new walls that miss the
+    cached path leave it valid (and optimal, if it was), so the entry moves
+    up to the current version.  A wall on the path, any removed wall
+    (which may open a shorter route) or a lost log drops it.
+    """
+    def __init__(self, size=256):
+        self.size, self.hits, self.misses = size, 0, 0
+        self.entries = OrderedDict()    # key -> [grid, version, result]
+
+    def _valid(self, grid, entry):
+        g, version, result = entry
+        path = result[0]
+        if g is not grid: return False
+        changes = grid.changes_since(version)
+        if changes is None or not all(wall for _, wall in changes): return False
+        on_path = set(path or ())
+        return not any(grid.pos(i) in on_path for i, _ in changes)
+
+    def get(self, grid, key):
+        entry = self.entries.get(key)
+        if entry is not None and not self._valid(grid, entry):
+            del self.entries[key]; entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry[1] = grid.version
+        self.entries.move_to_end(key)
+        return entry[2]
+
+    def put(self, grid, key, result):
+        self.entries[key] = [grid, grid.version, result]
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+#  Incremental replanning (D* Lite)
+class DStarLite:
+    """D* Lite on a FlatGrid, searching backwards from the goal.
+
+    g/rhs values and the open list survive between calls: ``move()`` the
+    start as the agent walks, feed wall edits to ``update()``, then
+    ``plan()`` repairs only the part of the search tree the edits touched.
+    Positions are (r, c) tuples, like run_astar.
+    """
+    INF = float("inf")
+
+    def __init__(self, grid, start, goal, h):
+        self.grid, self.h = grid, h
+        self.start = self._last = grid.id(*start)
+        self.goal  = grid.id(*goal)
+        self.hf    = id_heuristic(grid, h, self.start)
+        self.km    = 0
+        self.g, self.rhs = {}, {self.goal: 0}
+        self.keys  = {}          # node -> key of its live open-list entry
+        self.heap  = []
+        self.counter = 0
+        self._push(self.goal)
+
+    def _key(self, n):
+        m = min(self.g.get(n, self.INF), self.rhs.get(n, self.INF))
+        return (m + self.hf(n) + self.km, m)
+
+    def _push(self, n):
+        k = self.keys[n] = self._key(n)
+        self.counter += 1
+        heapq.heappush(self.heap, (k[0], k[1], self.counter, n))
+
+    def _update_vertex(self, n):
+        cells, INF, g = self.grid.cells, self.INF, self.g
+        if n != self.goal:
+            if cells[n]:
+                self.rhs[n] = INF
+            else:
+                self.rhs[n] = min([g.get(n+d, INF) for d in self.grid.offsets
+                                   if not cells[n+d]], default=INF) + 1
+        if g.get(n, INF) != self.rhs.get(n, INF):
+            self._push(n)
+        else:
+            self.keys.pop(n, None)
+
+    def _top(self):
+        heap, keys = self.heap, self.keys
+        while heap:
+            k1, k2, _, n = heap[0]
+            if keys.get(n) == (k1, k2):
+                return (k1, k2), n
+            heapq.heappop(heap)
+        return (self.INF, self.INF), None
+
+    def move(self, pos):
+        self.start = self.grid.id(*pos)
+
+    def _rebase(self):
+        # km keeps old open-list keys valid as lower bounds after the start moved
+        if self.start != self._last:
+            self.km += self.hf(self.start)
+            self._last = self.start
+            self.hf = id_heuristic(self.grid, self.h, self.start)
+
+    def update(self, changed):
+        self._rebase()
+        cells, offs = self.grid.cells, self.grid.offsets
+        for rc in changed:
+            n = self.grid.id(*rc)
+            self._update_vertex(n)
+            for d in offs:
+                if not cells[n+d]: self._update_vertex(n+d)
+
+    def plan(self):
+        if unreachable(self.grid, self.start, self.goal):
+            return None, [], 0
+        self._rebase()
+        cells, offs, INF = self.grid.cells, self.grid.offsets, self.INF
+        g, rhs, start = self.g, self.rhs, self.start
+        visited_order = []
+        while True:
+            k_old, u = self._top()
+            if u is None: break
+            if k_old >= self._key(start) and rhs.get(start, INF) == g.get(start, INF):
+                break
+            k_new = self._key(u)
+            if k_old < k_new:
+                self._push(u); continue
+            del self.keys[u]
+            visited_order.append(u)
+            if g.get(u, INF) > rhs.get(u, INF):
+                g[u] = rhs[u]
+                for d in offs:
+                    if not cells[u+d]: self._update_vertex(u+d)
+            else:
+                g[u] = INF
+                self._update_vertex(u)
+                for d in offs:
+                    if not cells[u+d]: self._update_vertex(u+d)
+        pos = self.grid.pos
+        vis = [pos(i) for i in visited_order]
+        if g.get(start, INF) == INF:
+            return None, vis, len(vis)
+        path, n = [start], start
+        while n != self.goal:
+            n = min((n+d for d in offs if not cells[n+d]), key=lambda m: g.get(m, INF))
+            path.append(n)
+        return [pos(i) for i in path], vis, len(vis)
+
+#  Cooperative multi-agent planning
+class ReservationTable:
+    """Space-time cells and moves claimed by already planned agents.
+
+    ``cells`` maps (t, id) to the agent standing there at step t and
+    ``moves`` holds (t, a, b) for every step from a to b between t and
+    t + 1, so a later agent can neither share a cell nor swap with anyone.
+    Agents leave the map when they reach their goal.
+    """
+    def __init__(self):
+        self.cells, self.moves = {}, set()
+
+    def reserve(self, agent, path, t0=0):
+        cells, moves = self.cells, self.moves
+        for t, n in enumerate(path, t0):
+            cells[t, n] = agent
+        for t, (a, b) in enumerate(zip(path, path[1:]), t0):
+            if a != b: moves.add((t, a, b))
+
+    def free(self, t, a, b):
+        # may an agent step (or wait, a == b) from a to b between t and t + 1?
+        return (t + 1, b) not in self.cells and (t, b, a) not in self.moves
+
+def space_time_astar(grid, start, goal, hf, table, slack=CROWD_SLACK, agent=None):
+    # A* over (id, t) with unit moves and waits, avoiding table's claims;
+    # hf is the exact distance field of goal.  Returns one id per step or
+    # None if no route arrives within hf(start) + slack steps.
+    cells, offs = grid.cells, grid.offsets
+    moves = (0,) + offs
+    d0 = hf(start)
+    if d0 >= FAR or table.cells.get((0, start), agent) != agent:
+        return None
+    horizon, size = d0 + slack, len(cells)
+    claimed, arrive = table.cells, {}
+    def eta(n, t):
+        # earliest step at which the goal is free, t + hf(n) at the soonest;
+        # charging the queue at the goal up front spares searching every
+        # way of waiting for it
+        a = t + hf(n)
+        e = arrive.get(a)
+        if e is None:
+            e = a
+            while (e, goal) in claimed: e += 1
+            arrive[a] = e
+        return e
+    parent = {start: None}          # state t*size + id -> previous state
+    heap = [(eta(start, 0), 0, start)]  # (f, -t, id): ties go to the later step
+    pop, push = heapq.heappop, heapq.heappush
+    free = table.free
     while heap:
-        _, _, cur = heapq.heappop(heap)
-        visited_order.append(cur)
-        if cur == goal:
-            return rebuild_path(cf, goal), visited_order, len(visited_order)
-        for nb in neighbors(cur, grid):
-            if nb not in seen:
-                seen.add(nb); cf[nb] = cur; counter += 1
-                heapq.heappush(heap, (h(nb, goal), counter, nb))
-    return None, visited_order, len(visited_order)
+        _, t, n = pop(heap)
+        t = -t
+        if n == goal:
+            path, s = [], t*size + n
+            while s is not None:
+                path.append(s % size); s = parent[s]
+            path.reverse()
+            return path
+        nt = t + 1
+        for d in moves:
+            nb = n + d
+            if cells[nb]: continue
+            f = eta(nb, nt)
+            if f > horizon or not free(t, n, nb): continue
+            s = nt*size + nb
+            if s in parent: continue
+            parent[s] = t*size + n
+            push(heap, (f, -nt, nb))
+    return None
+
+def plan_agents(grid, agents, slack=CROWD_SLACK, fields=None, table=None):
+    """Cooperative A*: plan (start, goal) pairs one by one, nearest first.
+
+    Each agent's route respects the reservations of those planned before
+    it, so no two agents share a cell or swap places at any step.  Agents
+    with the same goal share one distance field, taken from ``fields`` (a
+    TrueDistance) when given.  Returns one path per agent in input order, a
+    cell per time step, or None for agents with no conflict-free route
+    within their shortest distance + slack steps (they are not dispatched).
+    """
+    grid = as_grid(grid)
+    table = table or ReservationTable()
+    ids = [(grid.id(*s), grid.id(*g)) for s, g in agents]
+    for k, (s, _) in enumerate(ids):
+        table.cells.setdefault((0, s), k)       # nobody walks over the waiting
+    shared = {}
+    for _, g in ids:
+        if g not in shared:
+            field = fields.field(grid, g) if fields else distance_field(grid, g)
+            shared[g] = field.__getitem__
+    # agents close to their goal clear out first instead of queueing behind
+    order = sorted(range(len(ids)), key=lambda k: shared[ids[k][1]](ids[k][0]))
+    paths, pos = [None] * len(ids), grid.pos
+    for k in order:
+        s, g = ids[k]
+        path = space_time_astar(grid, s, g, shared[g], table, slack, k)
+        if path is not None:
+            table.reserve(k, path)
+            paths[k] = [pos(i) for i in path]
+    return paths
+
+def crowd_starts(grid, goal, n, rng=None):
+    # up to n random free cells that can reach goal, by rejection so big
+    # maps need no list of cells
+    grid, rng = as_grid(grid), make_rng(rng)
+    starts, seen, g = [], {goal}, grid.id(*goal)
+    for _ in range(20 * n):
+        if len(starts) == n: break
+        p = (rng.randrange(grid.rows), rng.randrange(grid.cols))
+        if p not in seen and not grid[p] and not unreachable(grid, grid.id(*p), g):
+            seen.add(p); starts.append(p)
+    return starts
+
+#  Flow fields (many agents, one goal)
+class FlowField:
+    """Distance to one goal and the next step toward it, for every cell.
+
+    ``dist`` is the BFS distance per node id and ``step`` a byte per id
+    naming the offset that leads one step closer (index + 1, 0 for none);
+    one sweep from the goal fills both.  Distances are symmetric, so the
+    field equally answers one-to-many queries from the goal.  After wall
+    edits dist is repaired with repair_field, and next_id() re-derives any
+    step that went stale, so following the field costs O(1) per move.
+    """
+    def __init__(self, grid, goal):
+        self.grid = as_grid(grid)
+        self.goal = self.grid.id(*goal)
+        self.rebuild()
+
+    def rebuild(self):
+        grid, goal = self.grid, self.goal
+        cells, n = grid.cells, len(grid.cells)
+        # v = u + o steps back to u through offset index k ^ 1
+        back = [(o, (k ^ 1) + 1) for k, o in enumerate(grid.offsets)]
+        self.dist = dist = array('i', [FAR]) * n
+        self.step = step = bytearray(n)
+        self.version = grid.version
+        if cells[goal]: return
+        dist[goal], frontier, d = 0, [goal], 0
+        while frontier:
+            d += 1
+            nxt = []
+            for u in frontier:
+                for o, k in back:
+                    v = u + o
+                    if not cells[v] and dist[v] == FAR:
+                        dist[v] = d; step[v] = k; nxt.append(v)
+            frontier = nxt
+
+    def sync(self):
+        v = self.grid.version
+        changes = self.grid.changes_since(self.version, v)
+        if changes is None:
+            self.rebuild()
+        else:
+            if changes: repair_field(self.grid, self.dist, changes, self.goal)
+            self.version = v
+
+    def next_id(self, i):
+        # neighbour one step closer to the goal; -1 at the goal or if cut off
+        if self.version != self.grid.version: self.sync()
+        dist, cells, offs = self.dist, self.grid.cells, self.grid.offsets
+        d = dist[i]
+        if d == 0 or d >= FAR: return -1
+        k = self.step[i]
+        if k:
+            j = i + offs[k-1]
+            if dist[j] == d - 1 and not cells[j]: return j
+        for k, o in enumerate(offs, 1):
+            j = i + o
+            if dist[j] == d - 1 and not cells[j]:
+                self.step[i] = k
+                return j
+        return -1
+
+    def next(self, p):
+        j = self.next_id(self.grid.id(*p))
+        return self.grid.pos(j) if j != -1 else None
+
+    def distance(self, p):
+        # steps from p to the goal (or goal to p), None if unreachable
+        if self.version != self.grid.version: self.sync()
+        d = self.dist[self.grid.id(*p)]
+        return d if d < FAR else None
+
+    def path(self, p):
+        # cells from p to the goal, None if the goal cannot be reached
+        i = self.grid.id(*p)
+        if self.distance(p) is None: return None
+        path, pos = [p], self.grid.pos
+        while i != self.goal:
+            i = self.next_id(i); path.append(pos(i))
+        return path
+
+#  Headless batch queries
+_worker_grid = None
+
+def _init_worker(rows, cols, cells):
+    global _worker_grid
+    _worker_grid = FlatGrid(rows, cols, cells)
+
+def _attach_worker(name):
+    global _worker_grid
+    _worker_grid = SharedGrid.attach(name)
+
+QUERY_RETRIES = 3    # searches of a live SharedGrid before falling back to a snapshot
+
+def _solve_query(query, grid=None):
+    start, goal, alg, hname = query
+    grid = grid or _worker_grid
+    h = HEURISTICS[hname]
+    for _ in range(QUERY_RETRIES):
+        # retry if a SharedGrid was edited mid-search, so the answer matches one version
+        ver, t0 = grid.version, time.perf_counter()
+        path, _, ne = ALGORITHMS[alg](grid, start, goal, h)
+        if grid.version == ver:
+            return path, ne, round((time.perf_counter()-t0)*1000, 3)
+    # edits keep landing mid-search: answer for a private copy of the walls
+    t0 = time.perf_counter()
+    snap = FlatGrid(grid.rows, grid.cols, bytes(grid.cells))
+    path, _, ne = ALGORITHMS[alg](snap, start, goal, h)
+    return path, ne, round((time.perf_counter()-t0)*1000, 3)
+
+class BatchSolver:
+    """Process pool that answers (start, goal, algorithm, heuristic) queries.
+
+    Every worker receives the grid once, when it starts, and keeps its own
+    search buffers, so a query only pickles four small values.  Results are
+    (path, nodes_expanded, ms) tuples in query order.  A SharedGrid is
+    attached by name instead of copied, and workers see its wall edits
+    live; for any other grid, create a new solver after editing it.
+    """
+    def __init__(self, grid, workers=None):
+        grid = as_grid(grid)
+        self.workers = workers or os.cpu_count() or 1
+        if isinstance(grid, SharedGrid):
+            init, args = _attach_worker, (grid.name,)
+        else:
+            init, args = _init_worker, (grid.rows, grid.cols, bytes(grid.cells))
+        self.pool = ProcessPoolExecutor(self.workers, initializer=init, initargs=args)
+
+    def solve(self, queries, chunksize=None):
+        queries = list(queries)
+        if chunksize is None:
+            chunksize = max(1, len(queries) // (4 * self.workers))
+        return list(self.pool.map(_solve_query, queries, chunksize=chunksize))
+
+    def close(self):
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def solve_batch(grid, queries, workers=None):
+    if workers == 1:
+        grid = as_grid(grid)
+        return [_solve_query(q, grid) for q in queries]
+    with BatchSolver(grid, workers) as solver:
+        return solver.solve(queries)
+
+#  Benchmarks (headless:  python a2.py --bench --json out.json)
+def maze_grid(rows, cols, rng=None):
+    # perfect maze: randomised DFS over even cells, opening the wall between
+    rng = make_rng(rng)
+    cells = [[1]*cols for _ in range(rows)]
+    cells[0][0] = 0
+    stack = [(0, 0)]
+    while stack:
+        r, c = stack[-1]
+        nxt = [(r+dr, c+dc) for dr, dc in ((-2, 0), (2, 0), (0, -2), (0, 2))
+               if 0 <= r+dr < rows and 0 <= c+dc < cols and cells[r+dr][c+dc]]
+        if not nxt:
+            stack.pop(); continue
+        nr, nc = rng.choice(nxt)
+        cells[(r+nr)//2][(c+nc)//2] = cells[nr][nc] = 0
+        stack.append((nr, nc))
+    return FlatGrid.from_rows(cells)
+
+def rooms_grid(rows, cols, room=16, rng=None):
+    # large open rooms: wall lines every room cells, one door per shared wall
+    rng = make_rng(rng)
+    cells = [[0]*cols for _ in range(rows)]
+    for r in range(room, rows, room): cells[r] = [1]*cols
+    for row in cells:
+        for c in range(room, cols, room): row[c] = 1
+    for r0 in range(0, rows, room):
+        for c0 in range(0, cols, room):
+            if r0 + room < rows:
+                cells[r0+room][rng.randrange(c0 + (c0 > 0), min(c0+room, cols))] = 0
+            if c0 + room < cols:
+                cells[rng.randrange(r0 + (r0 > 0), min(r0+room, rows))][c0+room] = 0
+    return FlatGrid.from_rows(cells)
+
+BENCH_FAMILIES = {
+    "empty":  lambda n, rng: make_grid(0, n, n),
+    "rand10": lambda n, rng: make_grid(0.10, n, n, rng),
+    "rand20": lambda n, rng: make_grid(0.20, n, n, rng),
+    "rand30": lambda n, rng: make_grid(0.30, n, n, rng),
+    "maze":   lambda n, rng: maze_grid(n, n, rng),
+    "rooms":  lambda n, rng: rooms_grid(n, n, rng=rng),
+}
+
+def bench_queries(grid, count, rng):
+    # the free corner-most pair first, then random free pairs
+    cells = grid.cells
+    free = [grid.pos(i) for i in range(len(cells)) if not cells[i]]
+    if len(free) < 2: return []
+    return [(free[0], free[-1])] + [tuple(rng.sample(free, 2)) for _ in range(count - 1)]
+
+def _percentile(xs, q):
+    # nearest rank on sorted xs
+    return xs[min(len(xs) - 1, max(0, math.ceil(q * len(xs)) - 1))]
+
+def benchmark(sizes=(64, 128, 256), queries=20, seed=0,
+              families=None, algorithms=None, heuristics=None):
+    """One row per (family, size, algorithm, heuristic) over the same queries.
+
+    Maps and queries depend only on seed, family and size.  Times are
+    per-query wall clock in ms; peak_kb is the traced allocation peak of the
+    first (corner to corner) query, re-run after the timed ones.
+    """
+    rows = []
+    for fam in families or BENCH_FAMILIES:
+        for n in sizes:
+            rng = random.Random(f"{seed}-{fam}-{n}")
+            random.seed(f"{seed}-{fam}-{n}")    # ALT picks landmarks with it
+            grid = BENCH_FAMILIES[fam](n, rng)
+            qs = bench_queries(grid, queries, rng)
+            for alg in algorithms or ALGORITHMS:
+                for hname in heuristics or HEURISTICS:
+                    run, h = ALGORITHMS[alg], HEURISTICS[hname]
+                    times, nodes, costs = [], [], []
+                    for a, b in qs:
+                        t0 = time.perf_counter()
+                        path, _, ne = run(grid, a, b, h)
+                        times.append((time.perf_counter() - t0) * 1000)
+                        nodes.append(ne)
+                        if path: costs.append(len(path) - 1)
+                    tracemalloc.start()
+                    run(grid, *qs[0], h)
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    times.sort()
+                    rows.append(dict(
+                        family=fam, size=n, algorithm=alg, heuristic=hname,
+                        queries=len(qs), found=len(costs),
+                        nodes_mean=round(sum(nodes) / len(qs), 1),
+                        cost_mean=round(sum(costs) / len(costs), 1) if costs else None,
+                        ms_p50=round(_percentile(times, .5), 3),
+                        ms_p90=round(_percentile(times, .9), 3),
+                        ms_p99=round(_percentile(times, .99), 3),
+                        ms_max=round(times[-1], 3),
+                        peak_kb=round(peak / 1024, 1)))
+    return rows
+
+def bench_main(argv):
+    import argparse
+    ap = argparse.ArgumentParser(prog="a2.py --bench", description="Benchmark the search engines.")
+    ap.add_argument("--bench", action="store_true")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[64, 128, 256])
+    ap.add_argument("--queries", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--families", nargs="+", choices=list(BENCH_FAMILIES))
+    ap.add_argument("--algorithms", nargs="+", choices=list(ALGORITHMS))
+    ap.add_argument("--heuristics", nargs="+", choices=list(HEURISTICS))
+    ap.add_argument("--json", metavar="FILE", help="also write the results here")
+    args = ap.parse_args(argv)
+    rows = benchmark(args.sizes, args.queries, args.seed,
+                     args.families, args.algorithms, args.heuristics)
+    cols = ("family", "size", "algorithm", "heuristic", "found", "nodes_mean",
+            "cost_mean", "ms_p50", "ms_p90", "ms_p99", "peak_kb")
+    print("  ".join(f"{c:>10}" for c in cols))
+    for row in rows:
+        print("  ".join(f"{str(row[c]):>10}" for c in cols))
+    if args.json:
+        meta = dict(python=sys.version.split()[0], seed=args.seed, sizes=args.sizes,
+                    queries=args.queries, time=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        with open(args.json, "w") as f:
+            json.dump(dict(meta=meta, results=rows), f, indent=1)
+
+#  Background search
+class SearchTask:
+    """Drives a streaming search on a worker thread for the Tk thread.
+
+    The worker advances the generator and queues ``("visited", batch)``
+    items, then ``("done", ((path, nodes_expanded), ms))`` or ``("error",
+    exception)``; poll(), called from root.after, hands them to on_visit,
+    on_done or on_error (without on_error the exception is raised).  The
+    queue is bounded, so a search shown in the sweep animation runs only as
+    far ahead as the animation lets it.  Without on_visit the batches are
+    just dropped.
+    cancel() stops the search at its next batch.  Searches are serialised by
+    a lock, because engines, heuristic caches and indexes reuse their buffers.
+    """
+    DEPTH = 8
+    _lock = threading.Lock()
+
+    def __init__(self, search, on_done, on_visit=None, on_error=None):
+        self.on_done, self.on_visit, self.on_error = on_done, on_visit, on_error
+        self.queue, self.cancelled = queue.Queue(self.DEPTH), False
+        threading.Thread(target=self._work, args=(search,), daemon=True).start()
+
+    def _put(self, item):
+        while not self.cancelled:
+            try:
+                self.queue.put(item, timeout=0.05); return
+            except queue.Full:
+                pass
+
+    def _work(self, search):
+        with self._lock:
+            spent = 0.0
+            while not self.cancelled:
+                t0 = time.perf_counter()
+                try:
+                    batch = next(search)
+                except StopIteration as stop:
+                    spent += time.perf_counter() - t0
+                    self._put(("done", (stop.value, round(spent*1000, 2))))
+                    return
+                except Exception as e:
+                    self._put(("error", e)); return
+                spent += time.perf_counter() - t0
+                if self.on_visit: self._put(("visited", batch))
+            search.close()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def poll(self, limit=None):
+        # deliver queued output, at most limit visited batches; True once finished
+        while not self.cancelled and limit != 0:
+            try:
+                kind, data = self.queue.get_nowait()
+            except queue.Empty:
+                return False
+            if kind == "visited":
+                self.on_visit(data)
+                if limit: limit -= 1
+            elif kind == "error":
+                if self.on_error is None: raise data
+                self.on_error(data)
+                return True
+            else:
+                self.on_done(*data)
+                return True
+        return self.cancelled
+
+#  Renderers
+class CanvasRenderer:
+    """Draws the app's grid onto its canvas with one persistent item per cell.
+
+    Callers mark cells dirty; they are flushed together once Tk goes idle,
+    and a flush only reconfigures rectangles whose fill really changed.
+    S, G and the agent are single items that move around, while path dots
+    come and go with the path.
+    """
+    def __init__(self, app):
+        self.app, self.canvas = app, app.canvas
+        self.dirty, self._job = set(), None
+        self.rects, self.fills, self.dots = [], [], {}
+
+    def _style(self, fill):
+        # walls get their texture from the outline instead of a second item
+        if fill == CL_WALL and self.app.cell > 8:
+            return dict(fill=CL_WALL_STK, outline=CL_WALL, width=2)
+        return dict(fill=fill, outline="", width=1)
+
+    def rebuild(self):
+        app, cv = self.app, self.canvas
+        if self._job is not None:
+            app.root.after_cancel(self._job); self._job = None
+        cv.delete("all")
+        self.dirty.clear(); self.dots.clear()
+        rows, cols, k = app.grid.rows, app.grid.cols, app.cell
+        for r in range(rows + 1):
+            cv.create_line(0, r*k, cols*k, r*k, fill=CL_GRID, width=1)
+        for c in range(cols + 1):
+            cv.create_line(c*k, 0, c*k, rows*k, fill=CL_GRID, width=1)
+        self.fills = [app._cell_fill(r, c) for r in range(rows) for c in range(cols)]
+        self.rects = [cv.create_rectangle(*app._cell_box(*divmod(i, cols)), **self._style(f))
+                      for i, f in enumerate(self.fills)]
+        font = ("Arial", 9, "bold")
+        self.s_text = cv.create_text(0, 0, text="S", fill=CL_WHITE, font=font, state="hidden")
+        self.g_text = cv.create_text(0, 0, text="G", fill=CL_WHITE, font=font, state="hidden")
+        self.rim  = cv.create_oval(0, 0, 0, 0, fill=CL_AGENT_RIM, outline="", state="hidden")
+        self.body = cv.create_oval(0, 0, 0, 0, fill=CL_AGENT, outline=CL_AGENT_RIM,
+                                   width=1, state="hidden")
+        self.dirty.update(app.path_set)     # for the dots
+        self.flush()
+
+    def mark(self, cells):
+        self.dirty.update(cells)
+        if self._job is None:
+            self._job = self.app.root.after_idle(self.flush)
+
+    def flush(self):
+        self._job = None
+        app, cv = self.app, self.canvas
+        cols, big = app.grid.cols, app.cell > 8
+        for r, c in self.dirty:
+            i = r*cols + c
+            fill = app._cell_fill(r, c)
+            if fill != self.fills[i]:
+                self.fills[i] = fill
+                cv.itemconfig(self.rects[i], **self._style(fill))
+            dot = self.dots.get((r, c))
+            if fill == CL_PATH and big:
+                if dot is None:
+                    x1, y1, x2, y2 = app._cell_box(r, c)
+                    cx, cy = (x1+x2)//2, (y1+y2)//2
+                    self.dots[r, c] = cv.create_oval(cx-4, cy-4, cx+4, cy+4,
+                                                     fill=CL_PATH_LINE, outline="")
+            elif dot is not None:
+                cv.delete(self.dots.pop((r, c)))
+        self.dirty.clear()
+        self._place(self.s_text, app.start, 0, text=True)
+        self._place(self.g_text, app.goal, 0, text=True)
+        self._place(self.rim,  app.agent_pos, 3)
+        self._place(self.body, app.agent_pos, 5)
+
+    def cell_at(self, x, y):
+        k = self.app.cell
+        r, c = y // k, x // k
+        if 0 <= r < self.app.grid.rows and 0 <= c < self.app.grid.cols:
+            return r, c
+        return None
+
+    def box(self, r, c):
+        return self.app._cell_box(r, c)
+
+    def _place(self, item, p, pad, text=False):
+        if p is None or self.app.cell <= 8:
+            self.canvas.itemconfig(item, state="hidden"); return
+        x1, y1, x2, y2 = self.app._cell_box(*p)
+        if text: self.canvas.coords(item, (x1+x2)//2, (y1+y2)//2)
+        else:    self.canvas.coords(item, x1+pad, y1+pad, x2-pad, y2-pad)
+        self.canvas.itemconfig(item, state="normal")
+
+class ImageRenderer:
+    """Draws the grid into a single PhotoImage, for maps too big for items.
+
+    The image covers the canvas viewport: ``zoom`` pixels per cell, with
+    cell (top, left) in the corner.  Walls come straight from grid.row()
+    and every other colour from a sparse per-row overlay, so redrawing a
+    dirty row is one list build and one put() of a pixel row that Tk tiles
+    over the row's zoom lines.
+    """
+    MAX_ZOOM = 32
+
+    def __init__(self, app):
+        self.app, self.canvas = app, app.canvas
+        self.zoom, self.top, self.left = app.cell, 0, 0
+        self.dirty, self._job, self.over = set(), None, {}
+        self.image = None
+
+    def _size(self):
+        return int(self.canvas.cget("width")), int(self.canvas.cget("height"))
+
+    def _paint(self, r, c):
+        fill = self.app._cell_fill(r, c)
+        row = self.over.setdefault(r, {})
+        if fill in (CL_EMPTY, CL_WALL): row.pop(c, None)
+        else:                           row[c] = fill
+
+    def rebuild(self):
+        app = self.app
+        if self._job is not None:
+            app.root.after_cancel(self._job); self._job = None
+        self.canvas.delete("all")
+        w, h = self._size()
+        self.image = tk.PhotoImage(width=w, height=h)
+        self.canvas.create_image(0, 0, image=self.image, anchor="nw")
+        self.over = {}
+        for p in (*app.visited_set, *app.path_set, *app.crowd_set,
+                  app.start, app.goal, app.agent_pos):
+            if p is not None: self._paint(*p)
+        self.redraw()
+
+    def redraw(self):
+        self.image.blank()
+        self.dirty = set(range(self.top, self.app.grid.rows))
+        self.flush()
+
+    def mark(self, cells):
+        for r, c in cells:
+            self._paint(r, c)
+            self.dirty.add(r)
+        if self._job is None:
+            self._job = self.app.root.after_idle(self.flush)
+
+    def flush(self):
+        self._job = None
+        grid, z, left = self.app.grid, self.zoom, self.left
+        w, h = self._size()
+        nc = min(grid.cols - left, -(-w // z))
+        pal = (CL_EMPTY, CL_WALL)
+        for r in self.dirty:
+            y = (r - self.top) * z
+            if not 0 <= y < h: continue
+            colors = [pal[x] for x in grid.row(r)[left:left+nc]]
+            for c, fill in self.over.get(r, {}).items():
+                if left <= c < left + nc: colors[c-left] = fill
+            if z > 1: colors = [x for x in colors for _ in range(z)]
+            self.image.put("{" + " ".join(colors) + "}", to=(0, y, nc*z, y+z))
+        self.dirty.clear()
+
+    def cell_at(self, x, y):
+        r, c = self.top + y // self.zoom, self.left + x // self.zoom
+        if 0 <= r < self.app.grid.rows and 0 <= c < self.app.grid.cols:
+            return r, c
+        return None
+
+    def box(self, r, c):
+        z = self.zoom
+        x1, y1 = (c - self.left) * z, (r - self.top) * z
+        return x1, y1, x1 + z, y1 + z
+
+    def _clamp(self, top, left):
+        w, h = self._size()
+        return (max(0, min(top,  self.app.grid.rows - h // self.zoom)),
+                max(0, min(left, self.app.grid.cols - w // self.zoom)))
+
+    def pan(self, dr, dc):
+        top, left = self._clamp(self.top + dr, self.left + dc)
+        if (top, left) != (self.top, self.left):
+            self.top, self.left = top, left
+            self.redraw()
+
+    def zoom_at(self, x, y, step):
+        # change zoom by step, keeping the cell under (x, y) in place
+        z = max(1, min(self.MAX_ZOOM, self.zoom + step))
+        if z == self.zoom: return
+        r, c = self.top + y // self.zoom, self.left + x // self.zoom
+        self.zoom = z
+        self.top, self.left = self._clamp(r - y // z, c - x // z)
+        self.redraw()
 
 #  Application
 class PathfinderApp:
@@ -134,12 +2502,21 @@ class PathfinderApp:
         self.alg_var  = tk.StringVar(value="A*")
         self.h_var    = tk.StringVar(value="Manhattan")
         self.dyn_var  = tk.BooleanVar(value=False)
+        self.prof_var = tk.BooleanVar(value=False)
         self.speed_var = tk.IntVar(value=5)   # 1-10
+        self.eps_var    = tk.DoubleVar(value=WEIGHT)   # WA* weight
+        self.budget_var = tk.IntVar(value=ARA_BUDGET_MS)
+        self.crowd_var  = tk.IntVar(value=CROWD_SIZE)
+        self.flow_var   = tk.BooleanVar(value=False)
+        self._ara_log   = []
+        self._ara_keep  = {}     # run_ara's search, resumed until a first path
 
         # Grid state 
         self.grid      = make_grid()
         self.start     = (1, 1)
         self.goal      = (ROWS-2, COLS-2)
+        self.cell      = CELL
+        self.rng       = random.Random(SEED)
         self._clear_sg()
 
         # Search results
@@ -148,20 +2525,33 @@ class PathfinderApp:
         self.visited_set  = set()
         self.agent_pos    = None
         self.agent_idx    = 0
-        self._vlist       = []   # visited order list
-        self._vidx        = 0   # animation cursor
+        self.crowd        = []    # cooperative paths, one cell per step
+        self.crowd_t      = 0
+        self.crowd_set    = set() # cells the crowd stands on at crowd_t
+        self._flow        = None  # FlowField toward self.goal, kept across runs
+        self._flock       = []    # node ids of agents following _flow
+        self._vlist       = deque()  # visited cells still to sweep
         self._drawing     = None # True=wall, False=erase
         self._placing     = None # 'start' | 'goal'
         self._anim_job    = None
         self._agent_job   = None
         self._replans     = 0
-        self._searching   = False
+        self._task        = None # SearchTask running on the worker thread
+        self._poll_job    = None
+        self._dstar       = None # incremental planner, kept across agent moves
+        self._hcache      = {}   # heuristic name -> per-goal cached heuristic
+        self._paths       = PathCache()
+        self._report      = None # profile() report of the last profiled run
 
         #  Metric string vars
         self.m_nodes  = tk.StringVar(value="—")
         self.m_cost   = tk.StringVar(value="—")
         self.m_time   = tk.StringVar(value="—")
         self.m_replan = tk.StringVar(value="0")
+        self.m_cache  = tk.StringVar(value="0 / 0")
+        self.m_heap   = tk.StringVar(value="—")
+        self.m_hcalls = tk.StringVar(value="—")
+        self.m_phases = tk.StringVar(value="—")
         self.m_status = tk.StringVar(value="Ready  ·  Draw walls then press   Run")
         self.m_alg_info = tk.StringVar(value="")
 
@@ -170,8 +2560,8 @@ class PathfinderApp:
 
     #  Build ui
     def _build_ui(self):
-        CW = COLS * CELL
-        CH = ROWS * CELL
+        CW = self.grid.cols * self.cell
+        CH = self.grid.rows * self.cell
 
         #Canvas
         self.canvas = tk.Canvas(
@@ -186,6 +2576,13 @@ class PathfinderApp:
         self.canvas.bind("<ButtonRelease-1>", lambda _: setattr(self, "_drawing", None))
         self.canvas.bind("<ButtonPress-3>",   self._erase)
         self.canvas.bind("<B3-Motion>",       self._erase)
+        self.canvas.bind("<MouseWheel>",      self._wheel)
+        self.canvas.bind("<Button-4>",        self._wheel)
+        self.canvas.bind("<Button-5>",        self._wheel)
+        self.canvas.bind("<ButtonPress-2>",   lambda e: setattr(self, "_pan_from", (e.x, e.y)))
+        self.canvas.bind("<B2-Motion>",       self._pan)
+        self._pan_from = None
+        self.view = CanvasRenderer(self)
 
         #Side panel
         panel = tk.Frame(self.root, bg=CL_PANEL, width=PANEL_W)
@@ -206,7 +2603,10 @@ class PathfinderApp:
         self._section_label(panel, "⚙  Algorithm")
         alg_frame = tk.Frame(panel, bg=CL_PANEL)
         alg_frame.pack(fill="x", padx=14, pady=(0, 6))
-        for alg, desc in [("A*", "Optimal · Slower"), ("GBFS", "Fast · Not optimal")]:
+        for alg, desc in [("A*", "Optimal · Slower"), ("Bi-A*", "Optimal · Meets midway"),
+                          ("GBFS", "Fast · Not optimal"),
+                          ("WA*", "Bounded · ε-suboptimal"), ("ARA*", "Anytime · Budgeted"),
+                          ("JPS", "Optimal · Open maps"), ("HPA*", "Hierarchical · Near-opt.")]:
             row = tk.Frame(alg_frame, bg=CL_PANEL)
             row.pack(fill="x", pady=2)
             rb = tk.Radiobutton(row, text=f"  {alg}", variable=self.alg_var, value=alg,
@@ -225,13 +2625,24 @@ class PathfinderApp:
         self.alg_info_lbl.pack(fill="x", padx=14, pady=(0, 4))
         self._update_alg_info()
 
+        opt_row = tk.Frame(panel, bg=CL_PANEL)
+        opt_row.pack(fill="x", padx=14, pady=(0, 6))
+        for text, var, lo, hi, inc in [("WA* ε", self.eps_var, 1.0, 10.0, 0.25),
+                                       ("ARA* ms", self.budget_var, 5, 5000, 5)]:
+            tk.Label(opt_row, text=text, bg=CL_PANEL, fg=CL_MUTED,
+                     font=("Arial", 8)).pack(side="left")
+            tk.Spinbox(opt_row, textvariable=var, from_=lo, to=hi, increment=inc,
+                       width=5, bg=CL_PANEL2, fg=CL_WHITE, buttonbackground=CL_PANEL2,
+                       font=("Arial", 8)).pack(side="left", padx=(4, 10))
+
         self._divider(panel)
 
         #  Heuristic
         self._section_label(panel, "  Heuristic")
         h_frame = tk.Frame(panel, bg=CL_PANEL)
         h_frame.pack(fill="x", padx=14, pady=(0, 6))
-        for h, desc in [("Manhattan", "|dx|+|dy|"), ("Euclidean", "√(dx²+dy²)")]:
+        for h, desc in [("Manhattan", "|dx|+|dy|"), ("Euclidean", "√(dx²+dy²)"),
+                        ("Exact", "BFS from goal"), ("ALT", "Landmarks")]:
             row = tk.Frame(h_frame, bg=CL_PANEL)
             row.pack(fill="x", pady=2)
             rb = tk.Radiobutton(row, text=f"  {h}", variable=self.h_var, value=h,
@@ -275,6 +2686,27 @@ class PathfinderApp:
         tk.Label(panel, text="Agent replans automatically if blocked",
                  bg=CL_PANEL, fg=CL_MUTED, font=("Arial", 8, "italic")
                  ).pack(anchor="w", padx=22, pady=(0, 6))
+        tk.Checkbutton(
+            dyn_row, text="  Profile searches (counters, cProfile)",
+            variable=self.prof_var,
+            bg=CL_PANEL, fg=CL_WHITE, selectcolor=CL_ACCENT,
+            activebackground=CL_PANEL, activeforeground=CL_WHITE,
+            font=("Arial", 9)
+        ).pack(anchor="w")
+        crowd_row = tk.Frame(panel, bg=CL_PANEL)
+        crowd_row.pack(fill="x", padx=22, pady=(0, 6))
+        tk.Label(crowd_row, text="Crowd agents", bg=CL_PANEL, fg=CL_MUTED,
+                 font=("Arial", 8)).pack(side="left")
+        tk.Spinbox(crowd_row, textvariable=self.crowd_var, from_=1, to=2000, increment=10,
+                   width=5, bg=CL_PANEL2, fg=CL_WHITE, buttonbackground=CL_PANEL2,
+                   font=("Arial", 8)).pack(side="left", padx=(4, 0))
+        tk.Checkbutton(
+            panel, text="  Crowd follows one flow field",
+            variable=self.flow_var,
+            bg=CL_PANEL, fg=CL_WHITE, selectcolor=CL_ACCENT,
+            activebackground=CL_PANEL, activeforeground=CL_WHITE,
+            font=("Arial", 9)
+        ).pack(anchor="w", padx=14, pady=(0, 6))
 
         self._divider(panel)
 
@@ -282,9 +2714,13 @@ class PathfinderApp:
         self._section_label(panel, "  Controls")
         btns = [
             ("▶   Run Search",    self._run,        "run"),
+            ("👥  Run Crowd",       self._run_crowd,  "run"),
             ("↺   Reset Grid",    self._reset,       "reset"),
             ("🎲  New Random Maze", self._new_maze,   "maze"),
             ("🗑   Clear All Walls", self._clear_walls, "clear"),
+            ("💾  Save Map",        self._save_map,   "file"),
+            ("📂  Load Map",        self._load_map,   "file"),
+            ("📊  Export Profile",  self._export_profile, "file"),
         ]
         for txt, cmd, key in btns:
             bg, abg = BTN[key]
@@ -324,6 +2760,10 @@ class PathfinderApp:
             ("Path Cost",      self.m_cost,   CL_GREEN_LBL),
             ("Time (ms)",      self.m_time,   CL_YELLOW),
             ("Replans",        self.m_replan, CL_ORANGE),
+            ("Cache Hit/Miss", self.m_cache,  CL_OFFWHITE),
+            ("Push/Pop/Decr",  self.m_heap,   CL_ACCENT2),
+            ("h() / Peak Open", self.m_hcalls, CL_ACCENT2),
+            ("Heur/Search/Path", self.m_phases, CL_YELLOW),
         ]
         for i, (label, var, col) in enumerate(metrics):
             bg = CL_PANEL2 if i % 2 == 0 else CL_PANEL
@@ -394,7 +2834,12 @@ class PathfinderApp:
     def _update_alg_info(self):
         info = {
             "A*":  "Uses f = g + h. Guarantees the shortest path when heuristic is admissible.",
-            "GBFS":"Uses f = h only. Very fast but may return a suboptimal path."
+            "Bi-A*":"A* from both ends at once, stopping when no cheaper meeting point is left.",
+            "GBFS":"Uses f = h only. Very fast but may return a suboptimal path.",
+            "WA*": "Uses f = g + ε·h. Fewer expansions; the path costs at most ε times the optimum.",
+            "ARA*":"Weighted A* passes with shrinking ε, reusing earlier work. Returns the best path found within the time budget.",
+            "JPS": "A* that jumps along straight runs. Same cost as A*, far fewer expansions on open maps.",
+            "HPA*":"Searches a graph of cluster entrances, then refines it to cells. Near-optimal, scales to huge maps."
         }
         self.m_alg_info.set(info[self.alg_var.get()])
 
@@ -404,70 +2849,48 @@ class PathfinderApp:
         if p == self.start:      return CL_START
         if p == self.goal:       return CL_GOAL
         if p == self.agent_pos:  return CL_AGENT
-        if self.grid[r][c] == 1: return CL_WALL
+        if p in self.crowd_set:  return CL_AGENT
+        if self.grid[r, c] == 1: return CL_WALL
         if p in self.path_set:   return CL_PATH
         if p in self.visited_set:return CL_VISITED
         return CL_EMPTY
 
-    def _draw_cell(self, r, c):
-        tag = f"cell_{r}_{c}"
-        self.canvas.delete(tag)
-        x1, y1 = c*CELL + 2, r*CELL + 2
-        x2, y2 = x1 + CELL - 3, y1 + CELL - 3
-        fill = self._cell_fill(r, c)
-        p = (r, c)
+    def _cell_box(self, r, c):
+        k = self.cell
+        pad, shrink = (2, 3) if k > 8 else (0, 0)
+        x1, y1 = c*k + pad, r*k + pad
+        return x1, y1, x1 + k - shrink, y1 + k - shrink
 
-        # Cell background
-        self.canvas.create_rectangle(x1, y1, x2, y2,
-                                     fill=fill, outline="", tags=tag)
-
-        # Special nodes
-        cx, cy = (x1+x2)//2, (y1+y2)//2
-        if p == self.start:
-            self.canvas.create_text(cx, cy, text="S", fill=CL_WHITE,
-                font=("Arial", 9, "bold"), tags=tag)
-        elif p == self.goal:
-            self.canvas.create_text(cx, cy, text="G", fill=CL_WHITE,
-                font=("Arial", 9, "bold"), tags=tag)
-        elif p == self.agent_pos:
-            # Glowing circle
-            pad = 5
-            self.canvas.create_oval(x1+pad-2, y1+pad-2, x2-pad+2, y2-pad+2,
-                fill=CL_AGENT_RIM, outline="", tags=tag)
-            self.canvas.create_oval(x1+pad, y1+pad, x2-pad, y2-pad,
-                fill=CL_AGENT, outline=CL_AGENT_RIM, width=1, tags=tag)
-        elif p in self.path_set and p not in [self.start, self.goal]:
-            # Small dot on path
-            dot = 4
-            self.canvas.create_oval(cx-dot, cy-dot, cx+dot, cy+dot,
-                fill=CL_PATH_LINE, outline="", tags=tag)
-        elif self.grid[r][c] == 1:
-            # Subtle texture on wall
-            self.canvas.create_rectangle(x1+2, y1+2, x2-2, y2-2,
-                fill=CL_WALL_STK, outline="", tags=tag)
+    def _draw_cell(self, r, c):
+        self.view.mark(((r, c),))
 
     def _full_redraw(self):
-        self.canvas.delete("all")
-        # Grid lines
-        for r in range(ROWS + 1):
-            self.canvas.create_line(0, r*CELL, COLS*CELL, r*CELL,
-                                    fill=CL_GRID, width=1)
-        for c in range(COLS + 1):
-            self.canvas.create_line(c*CELL, 0, c*CELL, ROWS*CELL,
-                                    fill=CL_GRID, width=1)
-        for r in range(ROWS):
-            for c in range(COLS):
-                self._draw_cell(r, c)
+        kind = ImageRenderer if self.grid.rows*self.grid.cols > CANVAS_CELLS else CanvasRenderer
+        if type(self.view) is not kind: self.view = kind(self)
+        self.view.rebuild()
 
     def _redraw_cells(self, cells):
-        for r, c in cells:
-            self._draw_cell(r, c)
+        self.view.mark(cells)
+
     #  Mouse use
     def _rc(self, event):
-        c, r = event.x // CELL, event.y // CELL
-        if 0 <= r < ROWS and 0 <= c < COLS:
-            return r, c
-        return None
+        return self.view.cell_at(event.x, event.y)
+
+    def _wheel(self, event):
+        if isinstance(self.view, ImageRenderer):
+            up = event.num == 4 or getattr(event, "delta", 0) > 0
+            self.view.zoom_at(event.x, event.y, 1 if up else -1)
+
+    def _pan(self, event):
+        # middle-drag scrolls an image-rendered map
+        last, self._pan_from = self._pan_from, (event.x, event.y)
+        if last is None or not isinstance(self.view, ImageRenderer): return
+        z = self.view.zoom
+        dr, dc = (last[1] - event.y) // z, (last[0] - event.x) // z
+        if dr or dc:
+            self.view.pan(dr, dc)
+        else:
+            self._pan_from = last
 
     def _press(self, event):
         rc = self._rc(event)
@@ -476,18 +2899,20 @@ class PathfinderApp:
         # Place start/goal mode
         if self._placing:
             old = self.start if self._placing == "start" else self.goal
-            self.grid[old[0]][old[1]] = 0
+            self.grid[old] = 0
             if self._placing == "start": self.start = (r, c)
             else:                        self.goal  = (r, c)
-            self.grid[r][c] = 0
+            self.grid[r, c] = 0
             self._placing = None
+            self._dstar   = None
             self.m_status.set("✓ Placed. Press ▶ Run to search.")
             self.root.configure(cursor="")
             self._redraw_cells([old, (r, c)])
             return
         if (r, c) in (self.start, self.goal): return
-        self._drawing = (self.grid[r][c] == 0)
-        self.grid[r][c] = 1 if self._drawing else 0
+        self._drawing = (self.grid[r, c] == 0)
+        self.grid[r, c] = 1 if self._drawing else 0
+        self._walls_changed([(r, c)])
         self._redraw_cells([(r, c)])
 
     def _drag(self, event):
@@ -496,7 +2921,8 @@ class PathfinderApp:
         if not rc: return
         r, c = rc
         if (r, c) in (self.start, self.goal): return
-        self.grid[r][c] = 1 if self._drawing else 0
+        self.grid[r, c] = 1 if self._drawing else 0
+        self._walls_changed([(r, c)])
         self._redraw_cells([(r, c)])
 
     def _erase(self, event):
@@ -504,7 +2930,8 @@ class PathfinderApp:
         if not rc: return
         r, c = rc
         if (r, c) in (self.start, self.goal): return
-        self.grid[r][c] = 0
+        self.grid[r, c] = 0
+        self._walls_changed([(r, c)])
         self._redraw_cells([(r, c)])
 
     def _start_placing(self, key):
@@ -515,83 +2942,243 @@ class PathfinderApp:
 
     #  Control
     def _cancel_jobs(self):
-        for attr in ("_anim_job", "_agent_job"):
+        for attr in ("_anim_job", "_agent_job", "_poll_job"):
             job = getattr(self, attr)
             if job: self.root.after_cancel(job)
             setattr(self, attr, None)
+        if self._task:
+            self._task.cancel(); self._task = None
 
     def _clear_sg(self):
-        self.grid[self.start[0]][self.start[1]] = 0
-        self.grid[self.goal[0]][self.goal[1]]   = 0
+        self.grid[self.start] = 0
+        self.grid[self.goal] = 0
 
     def _clear_search(self):
         self.path = []; self.path_set = set()
         self.visited_set = set()
         self.agent_pos = None; self.agent_idx = 0
-        self._vlist = []; self._vidx = 0
+        self.crowd = []; self.crowd_t = 0; self.crowd_set = set(); self._flock = []
+        self._vlist = deque()
         self._replans = 0
+        self._dstar = None
+        if self.grid.components is None:
+            self.grid.components = ComponentIndex(self.grid)
         self.m_nodes.set("—"); self.m_cost.set("—")
         self.m_time.set("—");  self.m_replan.set("0")
+        self.m_heap.set("—");  self.m_hcalls.set("—"); self.m_phases.set("—")
+
+    def _clear_shown(self):
+        # _clear_search, then erase the last run from the view cell by cell
+        shown = self.visited_set | self.path_set | self.crowd_set
+        if self.agent_pos: shown.add(self.agent_pos)
+        self._clear_search()
+        self._redraw_cells(shown)
 
     def _reset(self):
         self._cancel_jobs()
-        self.grid = make_grid(); self._clear_sg()
+        self.grid = make_grid(rows=self.grid.rows, cols=self.grid.cols); self._clear_sg()
         self._clear_search()
         self._full_redraw()
         self.m_status.set("Grid cleared. Draw walls then press  Run.")
 
     def _new_maze(self):
         self._cancel_jobs()
-        self.grid = make_grid(density=0.27); self._clear_sg()
+        self.grid = make_grid(0.27, self.grid.rows, self.grid.cols, self.rng); self._clear_sg()
         self._clear_search()
         self._full_redraw()
         self.m_status.set(" New maze ready. Press  Run!")
 
     def _clear_walls(self):
         self._cancel_jobs()
-        self.grid = make_grid(); self._clear_sg()
+        self.grid = make_grid(rows=self.grid.rows, cols=self.grid.cols); self._clear_sg()
         self._clear_search()
         self._full_redraw()
         self.m_status.set("All walls removed.")
 
+    def _save_map(self):
+        path = filedialog.asksaveasfilename(defaultextension=".a2map",
+                                            filetypes=[("A2 map", "*.a2map")])
+        if not path: return
+        save_map(path, self.grid, self.start, self.goal)
+        alt = HEURISTICS["ALT"]
+        if alt.lm is not None and alt.lm.grid is self.grid:
+            alt.landmarks(self.grid).save(path + ".alt")
+        self.m_status.set(f"💾 Saved {os.path.basename(path)}")
+
+    def _load_map(self):
+        path = filedialog.askopenfilename(filetypes=[("A2 map", "*.a2map")])
+        if not path: return
+        try:
+            grid, start, goal = load_map(path)
+        except (OSError, ValueError, struct.error) as e:
+            self.m_status.set(f" Could not load map: {e}")
+            return
+        self._cancel_jobs()
+        self.grid, self.start, self.goal = grid, start, goal
+        lm = Landmarks.load(path + ".alt", grid)
+        if lm is not None: HEURISTICS["ALT"].lm = lm
+        self._clear_sg()
+        self._clear_search()
+        self._fit_canvas()
+        self._full_redraw()
+        self.m_status.set(f"📂 Loaded {os.path.basename(path)}  ({grid.rows}×{grid.cols})")
+
+    def _fit_canvas(self):
+        # keep the window about the default size whatever the map dimensions
+        self.cell = max(1, min(CELL, COLS*CELL // self.grid.cols, ROWS*CELL // self.grid.rows))
+        self.canvas.config(width=min(self.grid.cols*self.cell, COLS*CELL),
+                           height=min(self.grid.rows*self.cell, ROWS*CELL))
+
+    def _walls_changed(self, cells):
+        if self._task: self._dstar = None    # the worker may be inside it
+        elif self._dstar: self._dstar.update(cells)
+
     #  Search
     def _hfn(self):
-        return manhattan if self.h_var.get() == "Manhattan" else euclidean
+        # one cache per heuristic, so replans toward self.goal reuse its table
+        name = self.h_var.get()
+        if name not in self._hcache:
+            h = HEURISTICS[name]
+            self._hcache[name] = h if hasattr(h, "bind") else HeuristicCache(h)
+        return self._hcache[name]
+
+    def _search(self, search, on_done, retry, key=None, on_visit=None):
+        # answer from the path cache when key is given, else run the streaming
+        # search on the worker; on_done((path, nodes_expanded), ms) is called
+        # back on the Tk thread.  If walls change meanwhile the result is
+        # dropped and retry() asks again.
+        if key is not None:
+            t0 = time.perf_counter()
+            hit = self._paths.get(self.grid, key)
+            self.m_cache.set(f"{self._paths.hits} / {self._paths.misses}")
+            if hit is not None:
+                on_done(hit, round((time.perf_counter()-t0)*1000, 2))
+                return
+        grid, version = self.grid, self.grid.version
+        def done(result, ms):
+            self._task = None
+            if grid.version != version:
+                retry(); return
+            if key is not None: self._paths.put(grid, key, result)
+            on_done(result, ms)
+        self._task = SearchTask(search, done, on_visit, self._failed)
+        self._poll_job = self.root.after(POLL_MS, self._poll)
+
+    def _failed(self, error):
+        # the search raised on the worker: stop the sweep instead of waiting on it
+        self._cancel_jobs()
+        self.m_status.set(f" Search failed: {error}")
+
+    def _poll(self):
+        self._poll_job = None
+        task = self._task
+        # take more expansions only once the sweep has nearly caught up
+        if task and not task.poll(1 if len(self._vlist) < VISIT_BATCH else 0):
+            self._poll_job = self.root.after(POLL_MS, self._poll)
 
     def _run(self):
         self._cancel_jobs()
-        self._clear_search()
+        self._clear_shown()
         self._clear_sg()
 
         alg = self.alg_var.get()
-        h   = self._hfn()
-
+        self._ara_keep = {}
         self.m_status.set(f"🔍 Running {alg} with {self.h_var.get()} heuristic...")
-        self.root.update()
+        self._launch(alg)
+        self._anim_job = self.root.after(2, self._tick_visited)
 
-        t0 = time.perf_counter()
-        if alg == "A*":
-            path, vis, ne = run_astar(self.grid, self.start, self.goal, h)
+    def _launch(self, alg):
+        h, opts = self._hfn(), self._alg_opts(alg)
+        if self.prof_var.get():
+            search = chunked(partial(self._profiled, **opts), alg, self.h_var.get(),
+                             self.grid, self.start, self.goal, h)
+            key = None
         else:
-            path, vis, ne = run_gbfs(self.grid, self.start, self.goal, h)
-        elapsed = round((time.perf_counter()-t0)*1000, 2)
-
+            search = stream(alg, self.grid, self.start, self.goal, h, **opts)
+            key = self._cache_key(self.start, alg, opts)
+        self._search(search, self._found, self._run, key=key, on_visit=self._vlist.extend)
+
+    def _alg_opts(self, alg):
+        # extra keyword arguments for the bounded-suboptimal searches
+        try:
+            if alg == "WA*":  return {"weight": max(1.0, float(self.eps_var.get()))}
+            if alg == "ARA*":
+                self._ara_log = []
+                return {"budget_ms": max(1, int(self.budget_var.get())), "log": self._ara_log,
+                        "keep": self._ara_keep}
+        except (tk.TclError, ValueError):
+            self.eps_var.set(WEIGHT); self.budget_var.set(ARA_BUDGET_MS)
+            return self._alg_opts(alg)
+        return {}
+
+    def _cache_key(self, start, alg, opts):
+        # ARA* answers depend on the clock (and hold its kept search), so they are never cached
+        if alg == "ARA*": return None
+        return (start, self.goal, alg, self.h_var.get()) + tuple(sorted(opts.items()))
+
+    def _profiled(self, alg, hname, grid, start, goal, h, **opts):
+        # runs on the worker thread, so the Tk variables are read by the caller
+        result, report = profile(partial(ALGORITHMS[alg], **opts), grid, start, goal, h,
+                                 capture="cprofile")
+        report.update(algorithm=alg, heuristic=hname,
+                      rows=grid.rows, cols=grid.cols, start=start, goal=goal)
+        self._report = report
+        return result
+
+    def _show_report(self):
+        rp = self._report
+        if "pops" in rp:
+            self.m_heap.set(f"{rp['pushes']} / {rp['pops']} / {rp['decreases']}")
+            self.m_hcalls.set(f"{rp['heuristic_calls']} / {rp['peak_open']}")
+        ph = rp["phases_ms"]
+        if ph:
+            self.m_phases.set(" / ".join(f"{ph.get(k, 0):.1f}" for k in ("heuristic", "search", "path")))
+
+    def _export_profile(self):
+        if not self._report:
+            self.m_status.set(" Tick 'Profile searches' and run a search first.")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".json",
+                                            filetypes=[("JSON", "*.json")])
+        if not path: return
+        with open(path, "w") as f:
+            json.dump(self._report, f, indent=1)
+        self.m_status.set(f"📊 Exported {os.path.basename(path)}")
+
+    def _found(self, result, elapsed):
+        path, ne = result
         self.m_nodes.set(str(ne))
         self.m_time.set(str(elapsed))
+        if self.prof_var.get() and self._report: self._show_report()
 
         if not path:
+            if self._ara_pending():
+                # budget spent before a first path: keep going on the next tick
+                self.m_status.set(f"⏳ ARA* budget spent after {ne} nodes, still searching...")
+                self._launch("ARA*")
+                return
             self.m_cost.set("N/A")
             self.m_status.set(" No path found! Try removing some walls.")
             return
 
         self.path     = path
         self.path_set = set(path)
-        self._vlist   = vis
         self.m_cost.set(str(len(path)-1))
-        self.m_status.set(f"Path found! Cost = {len(path)-1}  |  Sweeping explored nodes...")
-        self._full_redraw()
-        self._vidx = 0
-        self._anim_job = self.root.after(2, self._tick_visited)
+        self.m_status.set(f"Path found! Cost = {len(path)-1}{self._bound_note()}  |  Sweeping explored nodes...")
+        self._redraw_cells(path)
+
+    def _ara_pending(self):
+        # True while the kept ARA* search has neither a path nor a verdict
+        ara = self._ara_keep.get("ara")
+        return (self.alg_var.get() == "ARA*" and ara is not None
+                and ara.path is None and not ara.done)
+
+    def _bound_note(self):
+        if self.alg_var.get() == "ARA*" and self._ara_log:
+            return f" (≤ {self._ara_log[-1][2]:.2f} × optimal)"
+        if self.alg_var.get() == "WA*":
+            return f" (≤ {self._alg_opts('WA*')['weight']:g} × optimal)"
+        return ""
 
     # Animation 
     def _tick_visited(self):
@@ -600,7 +3187,10 @@ class PathfinderApp:
         delay = max(1, 14 - speed)  # faster speed = shorter delay
 
         for _ in range(batch):
-            if self._vidx >= len(self._vlist):
+            if not self._vlist:
+                if self._task: break         # caught up with the search
+                if not self.path:
+                    self._anim_job = None; return
                 # Sweep done — reveal path then launch agent
                 self.m_status.set(" Exploration done. Tracing path.")
                 self._show_path()
@@ -609,10 +3199,9 @@ class PathfinderApp:
                 self._redraw_cells([self.start])
                 self._agent_job = self.root.after(400, self._tick_agent)
                 return
-            node = self._vlist[self._vidx]
+            node = self._vlist.popleft()
             self.visited_set.add(node)
             self._draw_cell(node[0], node[1])
-            self._vidx += 1
 
         self._anim_job = self.root.after(delay, self._tick_visited)
 
@@ -638,9 +3227,9 @@ class PathfinderApp:
             changed = self._spawn_obs()
             if changed and self.agent_idx < len(self.path) - 1:
                 nxt = self.path[self.agent_idx + 1]
-                if self.grid[nxt[0]][nxt[1]] == 1:
+                if self.grid[nxt] == 1:
                     self.m_status.set(" Path blocked! Replanning.")
-                    self.root.after(60, self._replan)
+                    self._agent_job = self.root.after(60, self._replan)
                     return
 
         speed = self.speed_var.get()
@@ -648,32 +3237,46 @@ class PathfinderApp:
         self._agent_job = self.root.after(delay, self._tick_agent)
 
     def _spawn_obs(self):
-        changed = []
-        for r in range(ROWS):
-            for c in range(COLS):
-                if (r, c) not in (self.start, self.goal, self.agent_pos):
-                    if self.grid[r][c] == 0 and random.random() < OBS_PROB:
-                        self.grid[r][c] = 1
-                        changed.append((r, c))
+        changed = self.grid.random_fill(OBS_PROB, self.rng,
+                                        exclude=(self.start, self.goal, self.agent_pos,
+                                                 *self.crowd_set))
+        self._walls_changed(changed)
         self._redraw_cells(changed)
         return changed
 
     def _replan(self):
-        h   = self._hfn()
+        self._agent_job = None
         alg = self.alg_var.get()
-        t0  = time.perf_counter()
-        if alg == "A*":
-            path, vis, ne = run_astar(self.grid, self.agent_pos, self.goal, h)
+        if alg not in ("A*", "Bi-A*", "JPS"):
+            opts = self._alg_opts(alg)
+            self._search(stream(alg, self.grid, self.agent_pos, self.goal, self._hfn(), **opts),
+                         self._replanned, self._replan,
+                         key=self._cache_key(self.agent_pos, alg, opts))
         else:
-            path, vis, ne = run_gbfs(self.grid, self.agent_pos, self.goal, h)
-        elapsed = round((time.perf_counter()-t0)*1000, 2)
-
+            # Optimal algorithms share one D* Lite planner that only repairs
+            # what the spawned walls invalidated.
+            if self._dstar is None:
+                # D* Lite aims its heuristic at the moving agent, so per-goal
+                # tables would be rebuilt on every move: use the plain function.
+                # It also needs a heuristic that stays fixed as walls change.
+                h = HEURISTICS[self.h_var.get()]
+                if getattr(h, "dynamic", False): h = manhattan
+                self._dstar = DStarLite(self.grid, self.agent_pos, self.goal, h)
+            self._dstar.move(self.agent_pos)
+            self._search(chunked(self._dstar.plan), self._replanned, self._replan)
+
+    def _replanned(self, result, elapsed):
+        path, ne = result
         self._replans += 1
         self.m_replan.set(str(self._replans))
         self.m_time.set(str(elapsed))
         self.m_nodes.set(str(int(self.m_nodes.get()) + ne))
 
         if not path:
+            if self._ara_pending():
+                self.m_status.set("⏳ ARA* budget spent, still searching...")
+                self._replan()
+                return
             self.m_status.set("No path exists  trapped!")
             return
 
@@ -687,7 +3290,7 @@ class PathfinderApp:
         self.path_set = set(path)
         self.agent_idx = 0
         self.m_cost.set(str(len(path)-1))
-        self.m_status.set(f"🔄 Replanned  #{self._replans} · new cost = {len(path)-1}")
+        self.m_status.set(f"🔄 Replanned  #{self._replans} · new cost = {len(path)-1}{self._bound_note()}")
         self._show_path()
         self._redraw_cells([self.agent_pos])
 
@@ -695,14 +3298,134 @@ class PathfinderApp:
         delay = max(30, AGENT_DELAY - speed * 10)
         self._agent_job = self.root.after(delay, self._tick_agent)
 
+
+    #  Crowd (cooperative A*)
+    def _run_crowd(self):
+        self._cancel_jobs()
+        self._clear_shown()
+        self._clear_sg()
+        try:
+            n = max(1, int(self.crowd_var.get()))
+        except (tk.TclError, ValueError):
+            n = CROWD_SIZE; self.crowd_var.set(n)
+        # the starts are drawn on the worker: unreachable() syncs the
+        # component index, which only the search lock may touch
+        if self.flow_var.get(): self._follow_flow(n)
+        else:                   self._plan_crowd(n=n)
+
+    def _plan_crowd(self, agents=None, n=0):
+        # agents are (start, goal) pairs, or n random starts toward the goal
+        grid, goal, rng, fields = self.grid, self.goal, self.rng, HEURISTICS["Exact"]
+        def plan():
+            # runs on the worker thread; one distance field serves the crowd
+            todo = agents if agents is not None else [
+                (s, goal) for s in crowd_starts(grid, goal, n, rng)]
+            return plan_agents(grid, todo, fields=fields), [], len(todo)
+        self.m_status.set(f"👥 Planning {n or len(agents)} agents...")
+        self._search(chunked(plan), self._crowd_planned, partial(self._plan_crowd, agents, n))
+
+    def _crowd_planned(self, result, elapsed):
+        paths, n = result
+        self.crowd = [p for p in paths if p]
+        self.crowd_t = 0
+        self.m_time.set(str(elapsed))
+        self.m_cost.set(str(sum(len(p) - 1 for p in self.crowd)))
+        self.m_status.set(f"👥 {len(self.crowd)} / {n} agents routed without collisions")
+        self._move_crowd({p[0] for p in self.crowd})
+        self._agent_job = self.root.after(400, self._tick_crowd)
+
+    def _move_crowd(self, cells):
+        # redraw only the cells agents left or entered
+        changed = self.crowd_set ^ cells
+        self.crowd_set = cells
+        self._redraw_cells(changed)
+
+    def _tick_crowd(self):
+        t = self.crowd_t = self.crowd_t + 1
+        self._move_crowd({p[t] for p in self.crowd if t < len(p)})
+        if not self.crowd_set:
+            self._agent_job = None
+            self.m_status.set(" All agents reached the goal!")
+            return
+
+        if self.dyn_var.get():
+            changed = set(self._spawn_obs())
+            if changed and any(c in changed for p in self.crowd for c in p[t+1:]):
+                self.m_status.set(" Crowd routes blocked! Replanning.")
+                self._agent_job = self.root.after(60, self._replan_crowd)
+                return
+
+        speed = self.speed_var.get()
+        delay = max(30, AGENT_DELAY - speed * 10)
+        self._agent_job = self.root.after(delay, self._tick_crowd)
+
+    def _follow_flow(self, n):
+        # one sweep from the goal serves every agent; reuse it when we can
+        grid, goal, flow, rng = self.grid, self.goal, self._flow, self.rng
+        reuse = flow is not None and flow.grid is grid and flow.goal == grid.id(*goal)
+        def build():
+            # runs on the worker thread
+            starts = crowd_starts(grid, goal, n, rng)
+            if not reuse: return (FlowField(grid, goal), starts), [], 0
+            flow.sync()
+            return (flow, starts), [], 0
+        self.m_status.set(f"🌊 Sweeping a flow field for {n} agents...")
+        self._search(chunked(build), self._flow_ready, partial(self._follow_flow, n))
+
+    def _flow_ready(self, result, elapsed):
+        flow, starts = result[0]
+        self._flow = flow
+        self._flock = [self.grid.id(*s) for s in starts]
+        self.m_time.set(str(elapsed))
+        self.m_cost.set(str(sum(flow.distance(s) or 0 for s in starts)))
+        self.m_status.set(f"🌊 {len(starts)} agents following one flow field")
+        self._move_crowd(set(starts))
+        self._agent_job = self.root.after(400, self._tick_flow)
+
+    def _tick_flow(self):
+        # spawned walls are repaired into the field on its next use
+        if self.dyn_var.get(): self._spawn_obs()
+        flow, pos = self._flow, self.grid.pos
+        flow.sync()
+        # agents nearest the goal move first, so queues advance together
+        flock = sorted(self._flock, key=flow.dist.__getitem__)
+        taken, kept, moved = set(flock), [], False
+        for i in flock:
+            j = flow.next_id(i)
+            if j == flow.goal:
+                taken.discard(i); moved = True; continue     # arrived: leaves
+            if j != -1 and j not in taken:
+                taken.discard(i); taken.add(j); i = j; moved = True
+            kept.append(i)
+        self._flock = kept
+        self._move_crowd({pos(i) for i in kept})
+        if not kept:
+            self._agent_job = None
+            self.m_status.set(" All agents reached the goal!")
+            return
+        if not moved and all(flow.dist[i] >= FAR for i in kept):
+            self._agent_job = None
+            self.m_status.set(f" {len(kept)} agents are walled off from the goal")
+            return
+
+        speed = self.speed_var.get()
+        delay = max(30, AGENT_DELAY - speed * 10)
+        self._agent_job = self.root.after(delay, self._tick_flow)
+
+    def _replan_crowd(self):
+        # plan again from where everyone stands; routes restart at step 0
+        self._agent_job = None
+        self._replans += 1
+        self.m_replan.set(str(self._replans))
+        t = self.crowd_t
+        self._plan_crowd([(p[t], p[-1]) for p in self.crowd if t < len(p)])
     def _pulse_goal(self, times):
         """Flash the goal cell a few times to celebrate."""
         if times <= 0:
+            self.canvas.delete("pulse")
             self._draw_cell(self.goal[0], self.goal[1])
             return
-        r, c = self.goal
-        x1, y1 = c*CELL+2, r*CELL+2
-        x2, y2 = x1+CELL-3, y1+CELL-3
+        x1, y1, x2, y2 = self.view.box(*self.goal)
         tag = "pulse"
         self.canvas.delete(tag)
         col = CL_YELLOW if times % 2 == 0 else CL_GOAL
@@ -712,9 +3435,12 @@ class PathfinderApp:
         self.root.after(200, lambda: self._pulse_goal(times-1))
 #main
 if __name__ == "__main__":
-    root = tk.Tk()
-    app  = PathfinderApp(root)
-    root.mainloop()
+    if "--bench" in sys.argv:
+        bench_main(sys.argv[1:])
+    else:
+        root = tk.Tk()
+        app  = PathfinderApp(root)
+        root.mainloop()
 
 
 